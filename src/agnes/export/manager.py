@@ -7,6 +7,7 @@ import yaml
 from datetime import datetime
 import aiohttp
 import aioboto3
+from boto3.s3.transfer import TransferConfig
 from dataclasses import dataclass
 import logging
 from enum import Enum
@@ -14,6 +15,7 @@ import jinja2
 import pdfkit
 import xlsxwriter
 import io
+import os
 
 class ExportFormat(Enum):
     JSON = "json"
@@ -40,8 +42,17 @@ class DataExporter:
         self.config = config
         self.storage = ExportStorage(config['storage'])
         self.logger = logging.getLogger(__name__)
+        
+        # Keep every compiled template in memory and persist bytecode so
+        # ephemeral containers skip the parse on cold start
+        cache_dir = config.get('template_cache_dir', '/tmp/j2cache')
+        os.makedirs(cache_dir, exist_ok=True)
         self.template_env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader('templates/exports')
+            loader=jinja2.FileSystemLoader('templates/exports'),
+            cache_size=-1,
+            bytecode_cache=jinja2.FileSystemBytecodeCache(cache_dir),
+            auto_reload=False,
+            enable_async=True
         )
     
     async def export_data(self, task: ExportTask) -> str:
@@ -57,7 +68,7 @@ class DataExporter:
             if task.template:
                 template = self.template_env.get_template(task.template)
                 context = {'data': data}
-                content = template.render(context)
+                content = await template.render_async(context)
             else:
                 content = None
             
@@ -214,6 +225,12 @@ class ExportStorage:
         self.config = config
         self.type = config['type']
         self.session = aioboto3.Session()
+        self.transfer_config = TransferConfig(
+            multipart_chunksize=config.get(
+                'multipart_chunksize', 16 * 1024 * 1024
+            ),
+            max_concurrency=config.get('max_concurrency', 8)
+        )
     
     async def store_file(self,
                         file_path: str,
@@ -229,16 +246,18 @@ class ExportStorage:
         bucket = self.config['bucket']
         key = f"exports/{datetime.utcnow().strftime('%Y/%m/%d')}/{file_path.split('/')[-1]}"
         
+        # Upload by path so the transfer manager can read the file in
+        # parts and multipart large exports concurrently
         async with self.session.client('s3') as s3:
-            with open(file_path, 'rb') as f:
-                await s3.upload_fileobj(
-                    f,
-                    bucket,
-                    key,
-                    ExtraArgs={
-                        'ContentType': self._get_content_type(format)
-                    }
-                )
+            await s3.upload_file(
+                Filename=file_path,
+                Bucket=bucket,
+                Key=key,
+                ExtraArgs={
+                    'ContentType': self._get_content_type(format)
+                },
+                Config=self.transfer_config
+            )
         
         return f"https://{bucket}.s3.amazonaws.com/{key}"
     
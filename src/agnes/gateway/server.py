@@ -43,6 +43,8 @@ class APIGateway:
         self.routes: Dict[str, Route] = {}
         self.middleware: Dict[str, Callable] = {}
         self.rate_limiters: Dict[str, ratelimit.RateLimiter] = {}
+        self._request_counters: Dict[str, Dict[str, Any]] = {}
+        self._duration_histograms: Dict[tuple, Any] = {}
         self.cache = cachetools.TTLCache(
             maxsize=1000,
             ttl=300
@@ -72,11 +74,7 @@ class APIGateway:
     async def start(self):
         """Start API gateway"""
         app = web.Application(
-            middlewares=[
-                self._error_middleware,
-                self._auth_middleware,
-                self._cors_middleware
-            ]
+            middlewares=[self._combined_middleware]
         )
         
         # Setup routes
@@ -106,6 +104,12 @@ class APIGateway:
         """Add API route"""
         self.routes[route.id] = route
         
+        # Resolve labeled metric children once per route
+        self._request_counters[route.id] = {
+            method: self.request_total.labels(method, route.path)
+            for method in route.methods
+        }
+        
         # Setup rate limiter
         if route.rate_limit:
             self.rate_limiters[route.id] = ratelimit.RateLimiter(
@@ -120,12 +124,30 @@ class APIGateway:
         self.middleware[name] = middleware
     
     @web.middleware
-    async def _error_middleware(self,
-                              request: web.Request,
-                              handler: Callable) -> web.Response:
-        """Error handling middleware"""
+    async def _combined_middleware(self,
+                                 request: web.Request,
+                                 handler: Callable) -> web.Response:
+        """Error handling, authentication and CORS middleware"""
         try:
-            return await handler(request)
+            route = self._get_route(request)
+            request['route'] = route
+            if not route:
+                return await handler(request)
+            
+            if route.authentication:
+                self._authenticate(request, route.authentication)
+            
+            if not route.cors:
+                return await handler(request)
+            
+            headers = self._cors_headers(route.cors)
+            if request.method == 'OPTIONS':
+                return web.Response(headers=headers)
+            
+            response = await handler(request)
+            response.headers.extend(headers)
+            return response
+        
         except web.HTTPException as e:
             return web.json_response(
                 {
@@ -142,16 +164,10 @@ class APIGateway:
                 status=500
             )
     
-    @web.middleware
-    async def _auth_middleware(self,
-                             request: web.Request,
-                             handler: Callable) -> web.Response:
-        """Authentication middleware"""
-        route = self._get_route(request)
-        if not route or not route.authentication:
-            return await handler(request)
-        
-        auth = route.authentication
+    def _authenticate(self,
+                      request: web.Request,
+                      auth: Dict[str, Any]):
+        """Authenticate request against route settings"""
         auth_type = auth.get('type', 'jwt')
         
         if auth_type == 'jwt':
@@ -172,20 +188,10 @@ class APIGateway:
                 raise web.HTTPUnauthorized(
                     reason='Invalid token'
                 )
-        
-        return await handler(request)
     
-    @web.middleware
-    async def _cors_middleware(self,
-                             request: web.Request,
-                             handler: Callable) -> web.Response:
-        """CORS middleware"""
-        route = self._get_route(request)
-        if not route or not route.cors:
-            return await handler(request)
-        
-        cors = route.cors
-        headers = {
+    def _cors_headers(self, cors: Dict[str, Any]) -> Dict[str, str]:
+        """Build CORS headers for route settings"""
+        return {
             'Access-Control-Allow-Origin': cors.get(
                 'allow_origin',
                 '*'
@@ -206,13 +212,6 @@ class APIGateway:
                 cors.get('max_age', 86400)
             )
         }
-        
-        if request.method == 'OPTIONS':
-            return web.Response(headers=headers)
-        
-        response = await handler(request)
-        response.headers.extend(headers)
-        return response
     
     def _get_route(self,
                    request: web.Request) -> Optional[Route]:
@@ -232,7 +231,7 @@ class APIGateway:
     async def _handle_request(self,
                             request: web.Request) -> web.Response:
         """Handle API request"""
-        route = self._get_route(request)
+        route = request.get('route') or self._get_route(request)
         if not route:
             raise web.HTTPNotFound()
         
@@ -311,16 +310,37 @@ class APIGateway:
                 ).total_seconds()
                 
                 # Record metrics
-                self.request_duration.labels(
+                self._duration_histogram(
+                    route,
                     request.method,
-                    route.path,
                     service_response.status
                 ).observe(duration)
                 
-                self.request_total.labels(
-                    request.method,
-                    route.path
-                ).inc()
+                counter = self._request_counters[route.id].get(
+                    request.method
+                )
+                if counter is None:
+                    counter = self.request_total.labels(
+                        request.method,
+                        route.path
+                    )
+                counter.inc()
+    
+    def _duration_histogram(self,
+                            route: Route,
+                            method: str,
+                            status: int):
+        """Get cached request duration child for route"""
+        key = (route.id, method, status)
+        histogram = self._duration_histograms.get(key)
+        if histogram is None:
+            histogram = self.request_duration.labels(
+                method,
+                route.path,
+                status
+            )
+            self._duration_histograms[key] = histogram
+        return histogram
     
     async def _prepare_request(self,
                              request: web.Request,
@@ -1,11 +1,40 @@
-from typing import Dict, Any, List, Optional, Callable
+from typing import Dict, Any, List, Optional, Set, Callable
 import asyncio
+import bisect
+import itertools
 import random
 import time
 from dataclasses import dataclass
 from enum import Enum
 import aiohttp
+from multidict import CIMultiDict
+import logging
 import socket
+import xxhash
+
+# Headers that describe a single connection and must not be forwarded
+HOP_BY_HOP_HEADERS = frozenset((
+    'connection',
+    'keep-alive',
+    'proxy-authenticate',
+    'proxy-authorization',
+    'te',
+    'trailers',
+    'transfer-encoding',
+    'upgrade'
+))
+
+def _end_to_end_headers(headers: Any) -> CIMultiDict:
+    """Copy headers, dropping hop-by-hop ones and those named in Connection"""
+    hop_by_hop = set(HOP_BY_HOP_HEADERS)
+    for value in headers.getall('Connection', ()):
+        hop_by_hop.update(name.strip().lower() for name in value.split(','))
+    
+    return CIMultiDict(
+        (name, value)
+        for name, value in headers.items()
+        if name.lower() not in hop_by_hop
+    )
 
 class BalancingStrategy(Enum):
     ROUND_ROBIN = "round_robin"
@@ -29,20 +58,57 @@ class ServerStatus:
     current_connections: int = 0
     last_check_time: float = 0
     failed_checks: int = 0
+    ema: float = 0.0
+    base_url: str = ""
+    health_url: str = ""
+    
+    def __post_init__(self):
+        if not self.base_url:
+            self.base_url = f"http://{self.server.host}:{self.server.port}"
+        if not self.health_url:
+            self.health_url = self.base_url + self.server.health_check_path
 
 class LoadBalancer:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.servers: List[ServerStatus] = []
-        self.current_index = 0
+        self._rr_counter = itertools.count()
+        self._random = random.Random()
+        self._active_servers: List[ServerStatus] = []
+        self._last_pick: Optional[ServerStatus] = None
+        self._pool: Optional[List[ServerStatus]] = None
+        self._pool_ids: Set[int] = set()
+        self._slot_table: List[ServerStatus] = []
+        self._ring: List[int] = []
+        self._ring_keys: List[int] = []
         self.strategy = BalancingStrategy(config.get("strategy", "round_robin"))
-        self.session = aiohttp.ClientSession()
+        self.session = self._create_health_session()
+        self.logger = logging.getLogger(__name__)
+    
+    def _create_health_session(self) -> aiohttp.ClientSession:
+        """Create keep-alive session for health checks"""
+        interval = self.config.get("health_check_interval", 30)
+        nameservers = self.config.get("dns_nameservers")
+        connector = aiohttp.TCPConnector(
+            limit=0,
+            limit_per_host=4,
+            keepalive_timeout=interval * 2,
+            enable_cleanup_closed=True,
+            ttl_dns_cache=300,
+            resolver=(
+                aiohttp.AsyncResolver(nameservers=nameservers)
+                if nameservers else None
+            )
+        )
+        return aiohttp.ClientSession(connector=connector)
     
     async def initialize(self):
         """Initialize load balancer with servers"""
         for server_config in self.config["servers"]:
             server = ServerConfig(**server_config)
             self.servers.append(ServerStatus(server=server))
+        self._rebuild_active_servers()
+        self._rebuild_hash_ring()
         
         # Start health checks
         asyncio.create_task(self._health_check_loop())
@@ -54,20 +120,28 @@ class LoadBalancer:
     async def get_next_server(self, 
                             client_ip: Optional[str] = None) -> ServerStatus:
         """Get next available server based on strategy"""
-        active_servers = [s for s in self.servers if s.active]
+        active_servers = self._active_servers
         if not active_servers:
             raise Exception("No active servers available")
         
+        return self.try_alloc(active_servers, client_ip)
+    
+    def try_alloc(self,
+                  servers: List[ServerStatus],
+                  client_ip: Optional[str] = None) -> ServerStatus:
+        """Select a server from an already filtered active pool"""
+        self._use_pool(servers)
+        
         if self.strategy == BalancingStrategy.ROUND_ROBIN:
-            server = self._round_robin(active_servers)
+            server = self._round_robin(servers)
         elif self.strategy == BalancingStrategy.LEAST_CONNECTIONS:
-            server = self._least_connections(active_servers)
+            server = self._least_connections(servers)
         elif self.strategy == BalancingStrategy.WEIGHTED_ROUND_ROBIN:
-            server = self._weighted_round_robin(active_servers)
+            server = self._weighted_round_robin(servers)
         elif self.strategy == BalancingStrategy.IP_HASH:
-            server = self._ip_hash(active_servers, client_ip)
+            server = self._ip_hash(servers, client_ip)
         elif self.strategy == BalancingStrategy.RANDOM:
-            server = random.choice(active_servers)
+            server = self._random.choice(servers)
         else:
             raise ValueError(f"Unknown balancing strategy: {self.strategy}")
         
@@ -75,29 +149,63 @@ class LoadBalancer:
     
     def _round_robin(self, servers: List[ServerStatus]) -> ServerStatus:
         """Simple round-robin selection"""
-        server = servers[self.current_index % len(servers)]
-        self.current_index += 1
-        return server
+        return servers[next(self._rr_counter) % len(servers)]
     
     def _least_connections(self, 
                           servers: List[ServerStatus]) -> ServerStatus:
-        """Select server with least active connections"""
-        return min(servers, key=lambda s: s.current_connections)
+        """Select less loaded of two random servers by connection EMA"""
+        if len(servers) == 1:
+            return servers[0]
+        
+        first, second = self._random.sample(servers, 2)
+        candidate = second if second.ema < first.ema else first
+        
+        # Stay on the previous pick unless the candidate is clearly less loaded
+        last = self._last_pick
+        if last is not None and last is not candidate and \
+                id(last) in self._pool_ids and \
+                candidate.ema >= last.ema * self.config.get("ema_hysteresis", 0.9):
+            return last
+        
+        self._last_pick = candidate
+        return candidate
+    
+    def _use_pool(self, servers: List[ServerStatus]):
+        """Rebuild membership and slot tables when the pool list changes"""
+        if servers is self._pool:
+            return
+        
+        slot_table = []
+        for server in servers:
+            slot_table.extend([server] * server.server.weight)
+        self._pool = servers
+        self._pool_ids = {id(server) for server in servers}
+        self._slot_table = slot_table
+    
+    def _record_connections(self, server: ServerStatus):
+        """Fold current connection count into server EMA"""
+        alpha = self.config.get("ema_alpha", 0.3)
+        server.ema = alpha * server.current_connections + \
+            (1 - alpha) * server.ema
     
     def _weighted_round_robin(self, 
                             servers: List[ServerStatus]) -> ServerStatus:
         """Weighted round-robin selection"""
-        total_weight = sum(s.server.weight for s in servers)
-        point = (self.current_index % total_weight) + 1
-        
-        current_weight = 0
-        for server in servers:
-            current_weight += server.server.weight
-            if current_weight >= point:
-                self.current_index += 1
-                return server
+        slot_table = self._slot_table
+        if not slot_table:
+            return servers[0]
         
-        return servers[0]
+        return slot_table[next(self._rr_counter) % len(slot_table)]
+    
+    def _rebuild_active_servers(self):
+        """Rebuild cached active pool"""
+        self._active_servers = [s for s in self.servers if s.active]
+    
+    def _set_active(self, server: ServerStatus, active: bool):
+        """Update server health state"""
+        if server.active != active:
+            server.active = active
+            self._rebuild_active_servers()
     
     def _ip_hash(self, 
                  servers: List[ServerStatus], 
@@ -106,28 +214,107 @@ class LoadBalancer:
         if not client_ip:
             return self._round_robin(servers)
         
-        hash_value = sum(ord(c) for c in client_ip)
+        hash_value = xxhash.xxh3_64_intdigest(client_ip.encode())
+        ring = self._ring
+        pos = bisect.bisect_left(self._ring_keys, hash_value)
+        
+        # Walk clockwise past servers outside the pool so only their keys move
+        pool_ids = self._pool_ids
+        for offset in range(len(ring)):
+            server = self.servers[ring[(pos + offset) % len(ring)]]
+            if id(server) in pool_ids:
+                return server
+        
         return servers[hash_value % len(servers)]
     
+    def _rebuild_hash_ring(self):
+        """Rebuild consistent hash ring from server membership"""
+        virtual_nodes = self.config.get("virtual_nodes", 160)
+        points = sorted(
+            (
+                xxhash.xxh3_64_intdigest(
+                    f"{s.server.host}:{s.server.port}#{v}".encode()
+                ),
+                i
+            )
+            for i, s in enumerate(self.servers)
+            for v in range(virtual_nodes)
+        )
+        self._ring_keys = [key for key, _ in points]
+        self._ring = [i for _, i in points]
+    
     async def _health_check_loop(self):
         """Continuously check server health"""
+        timeout = self.config.get("health_check_timeout", 2.0)
+        deadline = self.config.get("health_check_deadline", timeout * 2)
+        
         while True:
-            tasks = [
-                self._check_server_health(server)
+            if not self.servers:
+                await asyncio.sleep(self.config.get("health_check_interval", 30))
+                continue
+            
+            started = time.perf_counter()
+            tasks = {
+                asyncio.create_task(
+                    asyncio.wait_for(
+                        self._check_server_health(server),
+                        timeout=timeout
+                    )
+                ): server
                 for server in self.servers
-            ]
-            await asyncio.gather(*tasks)
+            }
+            done, pending = await asyncio.wait(tasks, timeout=deadline)
+            
+            # A hung backend counts as a failed check instead of
+            # stalling the whole cycle
+            for task in done:
+                error = task.exception()
+                if error is not None:
+                    server = tasks[task]
+                    if isinstance(error, asyncio.TimeoutError):
+                        self.logger.warning(
+                            f"Health check timed out: "
+                            f"{server.server.host}:{server.server.port}"
+                        )
+                    else:
+                        self.logger.warning(
+                            f"Health check failed: "
+                            f"{server.server.host}:{server.server.port}: "
+                            f"{error!r}"
+                        )
+                    self._handle_failed_health_check(server)
+                    server.last_check_time = time.time()
+            
+            for task in pending:
+                task.cancel()
+                server = tasks[task]
+                self.logger.warning(
+                    f"Health check exceeded deadline: "
+                    f"{server.server.host}:{server.server.port}"
+                )
+                self._handle_failed_health_check(server)
+                server.last_check_time = time.time()
+            
+            self.logger.debug(
+                f"Health check cycle: {len(done)}/{len(tasks)} completed, "
+                f"{len(pending)} past deadline in "
+                f"{time.perf_counter() - started:.3f}s"
+            )
+            
             await asyncio.sleep(self.config.get("health_check_interval", 30))
     
     async def _check_server_health(self, server: ServerStatus):
         """Check health of individual server"""
-        url = f"http://{server.server.host}:{server.server.port}" \
-              f"{server.server.health_check_path}"
-        
         try:
-            async with self.session.get(url) as response:
+            async with self.session.head(
+                server.health_url,
+                allow_redirects=False,
+                timeout=aiohttp.ClientTimeout(
+                    total=self.config.get("health_check_timeout", 2.0)
+                )
+            ) as response:
                 if response.status == 200:
-                    server.active = True
+                    self._set_active(server, True)
                     server.failed_checks = 0
                 else:
                     self._handle_failed_health_check(server)
@@ -140,11 +327,23 @@ class LoadBalancer:
         """Handle failed health check"""
         server.failed_checks += 1
         if server.failed_checks >= self.config.get("max_failed_checks", 3):
-            server.active = False
+            self._set_active(server, False)
 
 class LoadBalancerProxy:
     def __init__(self, balancer: LoadBalancer):
         self.balancer = balancer
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit_per_host=100,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+                enable_cleanup_closed=True
+            )
+        )
+    
+    async def cleanup(self):
+        """Cleanup resources"""
+        await self.session.close()
     
     async def handle_request(self, 
                            request: Any, 
@@ -154,26 +353,26 @@ class LoadBalancerProxy:
         
         try:
             server.current_connections += 1
+            self.balancer._record_connections(server)
             return await self._forward_request(server, request)
         finally:
             server.current_connections -= 1
+            self.balancer._record_connections(server)
     
     async def _forward_request(self, 
                              server: ServerStatus, 
-                             request: Any) -> Any:
+                             request: Any) -> bytes:
         """Forward request to selected server"""
-        url = f"http://{server.server.host}:{server.server.port}"
-        
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.request(
-                    method=request.method,
-                    url=f"{url}{request.path_qs}",
-                    headers=request.headers,
-                    data=await request.read()
-                ) as response:
-                    return await response.read()
-        except Exception as e:
-            # Handle connection error
-            server.active = False
+            # Stream the request body upstream instead of buffering it
+            async with self.session.request(
+                method=request.method,
+                url=server.base_url + request.path_qs,
+                headers=_end_to_end_headers(request.headers),
+                data=request.content
+            ) as response:
+                return await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Only upstream connection errors take the server out
+            self.balancer._set_active(server, False)
             raise Exception(f"Forward request failed: {str(e)}")
@@ -1,5 +1,6 @@
 from typing import Dict, Any, Optional, List, Union
 import asyncio
+import collections
 import logging
 import json
 from datetime import datetime
@@ -7,9 +8,13 @@ import aiohttp
 import elasticsearch
 from elasticsearch import AsyncElasticsearch
 import structlog
+import msgspec
 from dataclasses import dataclass
+import os
+import shutil
 import socket
 import sys
+import time
 import traceback
 import gzip
 import io
@@ -25,33 +30,61 @@ class LogConfig:
     flush_interval: int = 5
     retention_days: int = 30
 
+class LogRecord(msgspec.Struct):
+    timestamp: str
+    hostname: str
+    level: str
+    logger: str
+    message: Optional[str]
+    context: Dict[str, Any]
+    exception: Optional[str]
+    trace_id: Optional[str]
+    span_id: Optional[str]
+    service: str
+    environment: str
+
 class LogFormatter:
     def __init__(self):
         self.hostname = socket.gethostname()
+        self._timestamp_second = -1
+        self._timestamp = ""
     
-    def format(self, record: Dict[str, Any]) -> Dict[str, Any]:
+    def format(self, record: Dict[str, Any]) -> LogRecord:
         """Format log record"""
-        return {
-            "timestamp": datetime.utcnow().isoformat(),
-            "hostname": self.hostname,
-            "level": record.get("level", "INFO"),
-            "logger": record.get("logger_name", "root"),
-            "message": record.get("event"),
-            "context": record.get("context", {}),
-            "exception": record.get("exception"),
-            "trace_id": record.get("trace_id"),
-            "span_id": record.get("span_id"),
-            "service": record.get("service", "agnes"),
-            "environment": record.get("environment", "production")
-        }
+        return LogRecord(
+            timestamp=self._get_timestamp(),
+            hostname=self.hostname,
+            level=record.get("level", "INFO"),
+            logger=record.get("logger_name", "root"),
+            message=record.get("event"),
+            context=record.get("context", {}),
+            exception=record.get("exception"),
+            trace_id=record.get("trace_id"),
+            span_id=record.get("span_id"),
+            service=record.get("service", "agnes"),
+            environment=record.get("environment", "production")
+        )
+    
+    def _get_timestamp(self) -> str:
+        """Get ISO timestamp cached at one-second granularity"""
+        second = int(time.time())
+        if second != self._timestamp_second:
+            self._timestamp_second = second
+            self._timestamp = datetime.utcfromtimestamp(second).isoformat()
+        return self._timestamp
 
 class ElasticsearchHandler:
     def __init__(self, config: LogConfig):
         self.config = config
-        self.client = AsyncElasticsearch(config.elastic_hosts)
-        self.buffer: List[Dict[str, Any]] = []
-        self.lock = asyncio.Lock()
+        self.client = AsyncElasticsearch(
+            config.elastic_hosts,
+            http_compress=True
+        )
+        self._active: collections.deque = collections.deque()
         self.formatter = LogFormatter()
+        self._encoder = msgspec.json.Encoder()
+        self._day_bucket = -1
+        self._index_header = b""
     
     async def initialize(self):
         """Initialize Elasticsearch handler"""
@@ -91,40 +124,51 @@ class ElasticsearchHandler:
     
     async def handle(self, record: Dict[str, Any]):
         """Handle log record"""
-        formatted_record = self.formatter.format(record)
+        self._active.append(self.formatter.format(record))
         
-        async with self.lock:
-            self.buffer.append(formatted_record)
-            
-            if len(self.buffer) >= self.config.batch_size:
-                await self._flush()
+        if len(self._active) >= self.config.batch_size:
+            await self._flush()
     
     async def _flush(self):
         """Flush buffered records to Elasticsearch"""
-        if not self.buffer:
+        if not self._active:
             return
         
-        async with self.lock:
-            records = self.buffer
-            self.buffer = []
+        # Swap buffers in one assignment; appends never need a lock
+        records, self._active = self._active, collections.deque()
         
         try:
-            actions = [
-                {
-                    "_index": f"{self.config.index_pattern}-"
-                             f"{datetime.utcnow():%Y.%m.%d}",
-                    "_source": record
-                }
-                for record in records
-            ]
+            # Build the NDJSON bulk body directly to skip the client's
+            # own JSON encoding
+            header = self._get_index_header()
+            body = bytearray()
+            for record in records:
+                body += header
+                body += self._encoder.encode(record)
+                body += b"\n"
             
-            await self.client.bulk(body=actions)
+            await self.client.bulk(
+                body=bytes(body),
+                headers={"content-type": "application/x-ndjson"}
+            )
         
         except Exception as e:
             print(f"Error flushing logs to Elasticsearch: {e}")
-            # Requeue failed records
-            async with self.lock:
-                self.buffer.extend(records)
+            # Requeue failed records ahead of newer ones
+            self._active.extendleft(reversed(records))
+    
+    def _get_index_header(self) -> bytes:
+        """Get bulk action line for today's index"""
+        day_bucket = int(time.time()) // 86400
+        if day_bucket != self._day_bucket:
+            self._day_bucket = day_bucket
+            day = datetime.utcfromtimestamp(day_bucket * 86400)
+            self._index_header = self._encoder.encode({
+                "index": {
+                    "_index": f"{self.config.index_pattern}-{day:%Y.%m.%d}"
+                }
+            }) + b"\n"
+        return self._index_header
     
     async def _periodic_flush(self):
         """Periodically flush buffer"""
@@ -225,12 +269,13 @@ class LogRotator:
     
     async def _compress_file(self, src_path: str, dst_path: str):
         """Compress log file"""
-        try:
+        def _compress():
             with open(src_path, 'rb') as f_in:
-                with gzip.open(dst_path, 'wb') as f_out:
-                    await asyncio.to_thread(
-                        lambda: f_out.write(f_in.read())
-                    )
+                with gzip.open(dst_path, 'wb', compresslevel=1) as f_out:
+                    shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+        
+        try:
+            await asyncio.to_thread(_compress)
         except Exception as e:
             print(f"Error compressing log file: {e}")
 
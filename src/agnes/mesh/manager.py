@@ -1,11 +1,15 @@
 from typing import Dict, Any, List, Optional
+import asyncio
+import time
 import yaml
 import kubernetes
 from kubernetes import client, config
 from kubernetes.client.rest import ApiException
 
 class ServiceMeshManager:
-    def __init__(self, kubeconfig_path: Optional[str] = None):
+    def __init__(self,
+                 kubeconfig_path: Optional[str] = None,
+                 status_cache_ttl: float = 5.0):
         if kubeconfig_path:
             config.load_kube_config(kubeconfig_path)
         else:
@@ -13,17 +17,32 @@ class ServiceMeshManager:
         
         self.v1 = client.CoreV1Api()
         self.custom_objects = client.CustomObjectsApi()
+        self.status_cache_ttl = status_cache_ttl
+        self._status_cache: Optional[Dict[str, Any]] = None
+        self._status_cached_at = 0.0
     
     async def apply_mesh_config(self, config_path: str):
         """Apply service mesh configuration"""
         with open(config_path) as f:
-            mesh_config = yaml.safe_load_all(f)
-            
-            for resource in mesh_config:
-                try:
-                    await self._apply_resource(resource)
-                except ApiException as e:
-                    print(f"Error applying resource: {e}")
+            resources = list(yaml.safe_load_all(f))
+        
+        # Apply resources concurrently, capped to spare the API server
+        semaphore = asyncio.Semaphore(16)
+        
+        async def _apply(resource: Dict[str, Any]):
+            async with semaphore:
+                await self._apply_resource(resource)
+        
+        results = await asyncio.gather(
+            *(_apply(resource) for resource in resources),
+            return_exceptions=True
+        )
+        
+        for result in results:
+            if isinstance(result, ApiException):
+                print(f"Error applying resource: {result}")
+            elif isinstance(result, Exception):
+                raise result
     
     async def _apply_resource(self, resource: Dict[str, Any]):
         """Apply Kubernetes resource"""
@@ -32,7 +51,8 @@ class ServiceMeshManager:
         namespace = resource.get("metadata", {}).get("namespace", "default")
         
         try:
-            await self.custom_objects.create_namespaced_custom_object(
+            await asyncio.to_thread(
+                self.custom_objects.create_namespaced_custom_object,
                 group=group,
                 version=version,
                 namespace=namespace,
@@ -41,7 +61,8 @@ class ServiceMeshManager:
             )
         except ApiException as e:
             if e.status == 409:  # Already exists
-                await self.custom_objects.patch_namespaced_custom_object(
+                await asyncio.to_thread(
+                    self.custom_objects.patch_namespaced_custom_object,
                     group=group,
                     version=version,
                     namespace=namespace,
@@ -52,25 +73,38 @@ class ServiceMeshManager:
     
     async def get_mesh_status(self) -> Dict[str, Any]:
         """Get service mesh status"""
+        now = time.monotonic()
+        if (
+            self._status_cache is not None and
+            now - self._status_cached_at < self.status_cache_ttl
+        ):
+            return self._status_cache
+        
         try:
-            # Get Istio pods
-            istio_pods = self.v1.list_namespaced_pod(
-                namespace="istio-system",
-                label_selector="app=istiod"
-            )
-            
-            # Get virtual services
-            virtual_services = self.custom_objects.list_cluster_custom_object(
-                group="networking.istio.io",
-                version="v1alpha3",
-                plural="virtualservices"
+            # Get Istio pods and virtual services off the event loop
+            istio_pods, virtual_services = await asyncio.gather(
+                asyncio.to_thread(
+                    self.v1.list_namespaced_pod,
+                    namespace="istio-system",
+                    label_selector="app=istiod"
+                ),
+                asyncio.to_thread(
+                    self.custom_objects.list_cluster_custom_object,
+                    group="networking.istio.io",
+                    version="v1alpha3",
+                    plural="virtualservices"
+                )
             )
             
-            return {
+            status = {
                 "istiod_status": self._get_pods_status(istio_pods.items),
                 "virtual_services": len(virtual_services["items"]),
                 "mesh_health": self._check_mesh_health(istio_pods.items)
             }
+            
+            self._status_cache = status
+            self._status_cached_at = now
+            return status
         
         except ApiException as e:
             print(f"Error getting mesh status: {e}")
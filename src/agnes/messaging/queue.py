@@ -1,9 +1,13 @@
-from typing import Dict, Any, Optional, Callable, List
+from typing import Dict, Any, Optional, Callable, List, Deque, Tuple
 import asyncio
+import collections
+import itertools
 import json
+import orjson
 import aio_pika
 from dataclasses import dataclass
 import logging
+import time
 from datetime import datetime
 import uuid
 
@@ -30,8 +34,15 @@ class MessageQueue:
         self.config = config
         self.connection = None
         self.channel = None
+        self._publish_channel = None
+        self._publish_batch: Deque[Tuple[
+            aio_pika.Exchange, aio_pika.Message, str, asyncio.Future
+        ]] = collections.deque()
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._publish_tasks: set = set()
         self.queues: Dict[str, aio_pika.Queue] = {}
         self.exchanges: Dict[str, aio_pika.Exchange] = {}
+        self._publish_exchanges: Dict[str, aio_pika.Exchange] = {}
         self.logger = logging.getLogger(__name__)
     
     async def connect(self):
@@ -40,7 +51,14 @@ class MessageQueue:
             self.config['url']
         )
         self.channel = await self.connection.channel()
-        await self.channel.set_qos(prefetch_count=1)
+        await self.channel.set_qos(
+            prefetch_count=self.config.get('prefetch_count', 100)
+        )
+        
+        # Dedicated confirm channel so publishes pipeline their acks
+        self._publish_channel = await self.connection.channel(
+            publisher_confirms=True
+        )
     
     async def declare_queue(self, config: QueueConfig):
         """Declare queue with given configuration"""
@@ -80,6 +98,8 @@ class MessageQueue:
         )
         
         self.exchanges[config.name] = exchange
+        self._publish_exchanges[config.name] = \
+            await self._publish_channel.get_exchange(config.name, ensure=False)
         return exchange
     
     async def publish(self,
@@ -88,26 +108,93 @@ class MessageQueue:
                      message: Dict[str, Any],
                      headers: Optional[Dict[str, Any]] = None):
         """Publish message to exchange"""
-        if exchange not in self.exchanges:
+        await self.publish_raw(
+            exchange,
+            routing_key,
+            orjson.dumps(message),
+            headers
+        )
+    
+    async def publish_raw(self,
+                         exchange: str,
+                         routing_key: str,
+                         body: bytes,
+                         headers: Optional[Dict[str, Any]] = None):
+        """Publish already encoded JSON body to exchange"""
+        if exchange == "":
+            exchange_obj = self._publish_channel.default_exchange
+        elif exchange in self._publish_exchanges:
+            exchange_obj = self._publish_exchanges[exchange]
+        else:
             raise ValueError(f"Exchange {exchange} not declared")
         
-        exchange_obj = self.exchanges[exchange]
-        
         try:
-            await exchange_obj.publish(
+            await self._enqueue_publish(
+                exchange_obj,
                 aio_pika.Message(
-                    body=json.dumps(message).encode(),
+                    body=body,
                     headers=headers or {},
-                    message_id=str(uuid.uuid4()),
-                    timestamp=datetime.utcnow().timestamp(),
+                    message_id=uuid.uuid4().hex,
+                    timestamp=time.time(),
                     content_type="application/json"
                 ),
-                routing_key=routing_key
+                routing_key
             )
         except Exception as e:
             self.logger.error(f"Error publishing message: {e}")
             raise
     
+    async def _enqueue_publish(self,
+                              exchange: aio_pika.Exchange,
+                              message: aio_pika.Message,
+                              routing_key: str):
+        """Queue message for the next publish batch and wait for confirm"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._publish_batch.append((exchange, message, routing_key, future))
+        
+        batch_size = self.config.get('publish_batch_size', 100)
+        if len(self._publish_batch) >= batch_size:
+            self._flush_publishes()
+        elif self._flush_handle is None:
+            # Flush on the next loop pass, batching publishes made this tick
+            self._flush_handle = loop.call_soon(self._flush_publishes)
+        
+        await future
+    
+    def _flush_publishes(self):
+        """Send the pending publish batch"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        
+        batch, self._publish_batch = \
+            self._publish_batch, collections.deque()
+        if batch:
+            task = asyncio.create_task(self._send_batch(batch))
+            self._publish_tasks.add(task)
+            task.add_done_callback(self._publish_tasks.discard)
+    
+    async def _send_batch(self, batch: Deque[Tuple[
+            aio_pika.Exchange, aio_pika.Message, str, asyncio.Future
+    ]]):
+        """Publish a batch concurrently and resolve each confirm"""
+        results = await asyncio.gather(
+            *(
+                exchange.publish(message, routing_key=routing_key)
+                for exchange, message, routing_key, _ in batch
+            ),
+            return_exceptions=True
+        )
+        
+        for (_, _, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
     async def consume(self,
                      queue: str,
                      callback: Callable[[Dict[str, Any], Dict[str, Any]], Any],
@@ -130,10 +217,10 @@ class MessageQueue:
                     retry_count = message.headers.get('x-retry-count', 0)
                     if retry_count < self.config['retry_count']:
                         # Retry message
-                        await self.publish(
+                        await self.publish_raw(
                             message.exchange or "",
                             message.routing_key,
-                            body,
+                            message.body,
                             {
                                 **message.headers,
                                 'x-retry-count': retry_count + 1,
@@ -142,10 +229,10 @@ class MessageQueue:
                         )
                     else:
                         # Move to DLQ
-                        await self.publish(
+                        await self.publish_raw(
                             "",
                             f"{queue}{self.config['dlq_suffix']}",
-                            body,
+                            message.body,
                             {
                                 **message.headers,
                                 'x-error': str(e),
@@ -183,10 +270,10 @@ class MessageQueue:
                     continue
                 
                 # Republish to original queue
-                await self.publish(
+                await self.publish_raw(
                     "",
                     routing_key,
-                    json.loads(message.body.decode()),
+                    message.body,
                     {
                         **message.headers,
                         'x-retry-count': retry_count + 1,
@@ -205,6 +292,7 @@ class MessageBroker:
         self.config = config
         self.queue = MessageQueue(config)
         self.subscribers: Dict[str, List[Callable]] = {}
+        self._consuming: set = set()
     
     async def initialize(self):
         """Initialize message broker"""
@@ -238,7 +326,23 @@ class MessageBroker:
         
         self.subscribers[topic].append(callback)
         
-        await self.queue.consume(
-            topic,
-            callback
-        )
+        # One broker consumer per topic, shared by its subscribers
+        if topic not in self._consuming:
+            self._consuming.add(topic)
+            await self.queue.consume(
+                topic,
+                self._dispatch(topic)
+            )
+    
+    def _dispatch(self, topic: str) -> Callable[[Dict[str, Any], Dict[str, Any]], Any]:
+        """Build callback handing each message to one topic subscriber in turn"""
+        subscribers = self.subscribers[topic]
+        turn = itertools.count()
+        
+        # Subscribers compete for messages as separate consumers would,
+        # so each message is handled, acked or retried exactly once
+        async def _handler(body: Dict[str, Any], headers: Dict[str, Any]):
+            callback = subscribers[next(turn) % len(subscribers)]
+            await callback(body, headers)
+        
+        return _handler
@@ -4,6 +4,8 @@ import aiohttp
 import logging
 from dataclasses import dataclass
 from enum import Enum
+import functools
+import itertools
 import json
 import time
 from datetime import datetime
@@ -15,12 +17,23 @@ import opentelemetry
 from opentelemetry import trace
 from opentelemetry.exporter.jaeger.thrift import JaegerExporter
 import nats
-from circuitbreaker import circuit
 import jwt
-import msgpack
+import msgspec
 import aiormq
 import aio_pika
 
+# Shared msgpack codecs for event payloads
+_msgpack_encoder = msgspec.msgpack.Encoder()
+_msgpack_decoder = msgspec.msgpack.Decoder()
+
+# Shared headers for calls made outside a traced span
+_NO_TRACE_HEADERS: Dict[str, str] = {}
+
+# Event publish coalescing limits
+PUBLISH_BATCH_MAX = 128
+PUBLISH_BATCH_WINDOW = 0.002  # seconds
+PUBLISH_QUEUE_MAX = 10000
+
 class ServiceState(Enum):
     STARTING = "starting"
     RUNNING = "running"
@@ -39,6 +52,8 @@ class ServiceConfig:
     logging: Dict[str, Any]
     auth: Dict[str, Any]
     dependencies: List[str]
+    rmq_publisher_confirms: bool = False
+    nats_queue_group: bool = False
 
 class Microservice:
     def __init__(self, config: ServiceConfig):
@@ -60,6 +75,12 @@ class Microservice:
         # Initialize communication channels
         self.nats = None
         self.rmq = None
+        self._rmq_channel = None
+        self._rmq_exchange = None
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._pub_queue: Optional[asyncio.Queue] = None
+        self._pub_task: Optional[asyncio.Task] = None
+        self._pub_inflight: Optional[List[tuple]] = None
         
         # Setup circuit breaker
         self.circuit_breaker = CircuitBreaker()
@@ -108,6 +129,7 @@ class Microservice:
             
             # Deregister from service discovery
             await self.discovery.deregister(self.config.name)
+            await self.discovery.close()
             
             # Stop health checks
             await self.health.stop()
@@ -161,17 +183,29 @@ class Microservice:
         with self.tracer.start_span(
             f"call_service_{service}_{endpoint}"
         ) as span:
+            # Fail fast while this endpoint's circuit is open
+            breaker = self.circuit_breaker.get_or_create((service, endpoint))
+            if breaker.is_open():
+                raise CircuitOpenError(
+                    f"Circuit open for {service}{endpoint}"
+                )
+            
             try:
-                # Call service with circuit breaker
-                return await self.circuit_breaker.call(
-                    self._make_http_request,
+                result = await self._make_http_request(
                     url=url,
                     method=method,
                     data=data,
                     timeout=timeout
                 )
+                breaker.on_success()
+                return result
+            
+            except asyncio.CancelledError:
+                breaker.on_cancel()
+                raise
             
             except Exception as e:
+                breaker.on_failure()
                 span.record_exception(e)
                 raise
     
@@ -179,24 +213,70 @@ class Microservice:
                           event_type: str,
                           data: Any):
         """Publish event to message broker"""
+        if self._pub_queue is None:
+            raise RuntimeError("Event publishing is not started")
+        
+        # Wait for the batch carrying this event so failures reach the caller
+        future = asyncio.get_running_loop().create_future()
+        await self._pub_queue.put((event_type, data, future))
+        await future
+    
+    async def _publish_loop(self):
+        """Coalesce queued events into batched broker publishes"""
+        while True:
+            batch = [await self._pub_queue.get()]
+            self._pub_inflight = batch
+            self._drain_pub_queue(batch)
+            
+            # Give a burst a short window to fill the batch
+            if len(batch) < PUBLISH_BATCH_MAX:
+                await asyncio.sleep(PUBLISH_BATCH_WINDOW)
+                self._drain_pub_queue(batch)
+            
+            await self._publish_batch(batch)
+            self._pub_inflight = None
+    
+    def _drain_pub_queue(self, batch: List[tuple]):
+        """Move queued events into batch up to the batch limit"""
+        while len(batch) < PUBLISH_BATCH_MAX and not self._pub_queue.empty():
+            batch.append(self._pub_queue.get_nowait())
+    
+    async def _publish_batch(self, batch: List[tuple]):
+        """Publish batch of events and resolve their waiters"""
+        try:
+            await self._send_batch(batch)
+        except Exception as e:
+            self.logger.error(f"Error publishing events: {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+    
+    async def _send_batch(self, batch: List[tuple]):
+        """Send batch of events to message brokers"""
         if self.nats:
-            # Publish to NATS
-            await self.nats.publish(
-                f"{self.config.name}.{event_type}",
-                msgpack.packb(data)
-            )
+            # Publish to NATS, flushing once per batch
+            for event_type, data, _ in batch:
+                await self.nats.publish(
+                    f"{self.config.name}.{event_type}",
+                    _msgpack_encoder.encode(data)
+                )
+            await self.nats.flush()
         
         if self.rmq:
             # Publish to RabbitMQ
-            exchange = await self.rmq.get_exchange(
-                f"{self.config.name}.events"
-            )
-            await exchange.publish(
-                aio_pika.Message(
-                    body=msgpack.packb(data)
-                ),
-                routing_key=event_type
-            )
+            await asyncio.gather(*(
+                self._rmq_exchange.publish(
+                    aio_pika.Message(
+                        body=_msgpack_encoder.encode(data)
+                    ),
+                    routing_key=event_type
+                )
+                for event_type, data, _ in batch
+            ))
     
     async def _init_components(self):
         """Initialize service components"""
@@ -212,6 +292,16 @@ class Microservice:
         # Setup metrics
         self.metrics.init_metrics(self.config.name)
         
+        # Shared HTTP session for inter-service calls
+        self._http = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=200,
+                limit_per_host=32,
+                keepalive_timeout=60,
+                ttl_dns_cache=300
+            )
+        )
+        
         # Initialize health checks
         self.health.add_check(
             "startup",
@@ -220,24 +310,29 @@ class Microservice:
         for dep in self.config.dependencies:
             self.health.add_check(
                 f"dependency_{dep}",
-                lambda: self._check_dependency(dep)
+                functools.partial(self._check_dependency, dep)
             )
     
     async def _init_communication(self):
         """Initialize communication channels"""
+        self._pub_queue = asyncio.Queue(maxsize=PUBLISH_QUEUE_MAX)
+        
         # Connect to NATS if configured
         if self.config.get('nats'):
             self.nats = await nats.connect(
                 self.config['nats']['url']
             )
             
-            # Subscribe to events
+            # Subscribe per event type; every instance receives each event
+            # unless the service opts into a queue group
+            queue = self.config.name if self.config.nats_queue_group else ""
             for event_type, handler in self.event_handlers.items():
                 await self.nats.subscribe(
                     f"*.{event_type}",
-                    cb=lambda msg: self._handle_nats_event(
-                        msg,
-                        handler
+                    queue=queue,
+                    cb=functools.partial(
+                        self._handle_nats_event,
+                        handler=handler
                     )
                 )
         
@@ -248,11 +343,16 @@ class Microservice:
             )
             
             # Setup exchanges and queues
-            channel = await self.rmq.channel()
+            # Confirms are opt-in; fire-and-forget publishing by default
+            channel = await self.rmq.channel(
+                publisher_confirms=self.config.rmq_publisher_confirms
+            )
             exchange = await channel.declare_exchange(
                 f"{self.config.name}.events",
                 aio_pika.ExchangeType.TOPIC
             )
+            self._rmq_channel = channel
+            self._rmq_exchange = exchange
             
             # Setup event handlers
             for event_type, handler in self.event_handlers.items():
@@ -264,19 +364,42 @@ class Microservice:
                     routing_key=event_type
                 )
                 await queue.consume(
-                    lambda msg: self._handle_rmq_event(
-                        msg,
-                        handler
+                    functools.partial(
+                        self._handle_rmq_event,
+                        handler=handler
                     )
                 )
+        
+        # Start batched event publisher
+        self._pub_task = asyncio.create_task(self._publish_loop())
     
     async def _stop_communication(self):
         """Stop communication channels"""
+        if self._pub_task:
+            self._pub_task.cancel()
+            try:
+                await self._pub_task
+            except asyncio.CancelledError:
+                pass
+            
+            # Flush the interrupted batch and events still waiting in the queue
+            batch = self._pub_inflight or []
+            self._pub_inflight = None
+            self._drain_pub_queue(batch)
+            while batch:
+                await self._publish_batch(batch)
+                batch = []
+                self._drain_pub_queue(batch)
+            self._pub_queue = None
+        
         if self.nats:
             await self.nats.close()
         
         if self.rmq:
             await self.rmq.close()
+        
+        if self._http:
+            await self._http.close()
     
     async def _make_http_request(self,
                                url: str,
@@ -284,21 +407,24 @@ class Microservice:
                                data: Any = None,
                                timeout: int = 30) -> Any:
         """Make HTTP request to another service"""
-        async with aiohttp.ClientSession() as session:
-            async with session.request(
-                method,
-                url,
-                json=data,
-                timeout=timeout,
-                headers=self._get_trace_headers()
-            ) as response:
-                return await response.json()
+        async with self._http.request(
+            method,
+            url,
+            json=data,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+            headers=self._get_trace_headers()
+        ) as response:
+            return await response.json()
     
     def _get_trace_headers(self) -> Dict[str, str]:
         """Get tracing headers for requests"""
+        ctx = trace.get_current_span().get_span_context()
+        if not ctx.trace_id:
+            return _NO_TRACE_HEADERS
+        
         return {
-            'X-Trace-ID': trace.get_current_span().get_span_context().trace_id,
-            'X-Span-ID': trace.get_current_span().get_span_context().span_id
+            'X-Trace-ID': f'{ctx.trace_id:032x}',
+            'X-Span-ID': f'{ctx.span_id:016x}'
         }
     
     async def _check_startup(self) -> bool:
@@ -314,9 +440,11 @@ class Microservice:
             
             # Make health check request
             url = f"http://{instance['host']}:{instance['port']}/health"
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=5) as response:
-                    return response.status == 200
+            async with self._http.get(
+                url,
+                timeout=aiohttp.ClientTimeout(total=5)
+            ) as response:
+                return response.status == 200
         
         except Exception:
             return False
@@ -326,7 +454,7 @@ class Microservice:
                                handler: Callable):
         """Handle NATS event"""
         try:
-            data = msgpack.unpackb(msg.data)
+            data = _msgpack_decoder.decode(msg.data)
             await handler(data)
             await msg.ack()
         
@@ -340,7 +468,7 @@ class Microservice:
         """Handle RabbitMQ event"""
         try:
             async with msg.process():
-                data = msgpack.unpackb(msg.body)
+                data = _msgpack_decoder.decode(memoryview(msg.body))
                 await handler(data)
         
         except Exception as e:
@@ -354,6 +482,12 @@ class ServiceDiscovery:
             host=config['consul']['host'],
             port=config['consul']['port']
         )
+        
+        # Healthy instances per service, kept fresh by blocking queries
+        self._svc_cache: Dict[str, List[Dict[str, Any]]] = {}
+        self._svc_index: Dict[str, Any] = {}
+        self._watchers: Dict[str, asyncio.Task] = {}
+        self._rr: Dict[str, Any] = {}
     
     async def register(self,
                       name: str,
@@ -381,19 +515,61 @@ class ServiceDiscovery:
     async def get_service(self,
                          name: str) -> Optional[Dict[str, Any]]:
         """Get service instance from Consul"""
-        index, services = await self.consul.health.service(
-            name,
-            passing=True
-        )
+        if name not in self._svc_cache:
+            index, services = await self.consul.health.service(
+                name,
+                passing=True
+            )
+            self._update_cache(name, index, services)
+            
+            if name not in self._watchers:
+                self._watchers[name] = asyncio.create_task(
+                    self._watch(name)
+                )
         
-        if services:
-            service = services[0]['Service']
-            return {
-                'host': service['Address'],
-                'port': service['Port']
-            }
+        if self._svc_cache[name]:
+            return next(self._rr[name])
         
         return None
+    
+    async def close(self):
+        """Stop service watchers"""
+        for watcher in self._watchers.values():
+            watcher.cancel()
+        self._watchers.clear()
+    
+    def _update_cache(self,
+                      name: str,
+                      index: Any,
+                      services: List[Dict[str, Any]]):
+        """Replace cached instances for service"""
+        self._svc_index[name] = index
+        self._svc_cache[name] = [
+            {
+                'host': service['Service']['Address'],
+                'port': service['Service']['Port']
+            }
+            for service in services
+        ]
+        self._rr[name] = itertools.cycle(self._svc_cache[name])
+    
+    async def _watch(self, name: str):
+        """Refresh cached instances using Consul blocking queries"""
+        while True:
+            try:
+                index, services = await self.consul.health.service(
+                    name,
+                    index=self._svc_index.get(name),
+                    wait='30s',
+                    passing=True
+                )
+                self._update_cache(name, index, services)
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Error watching service {name}: {e}")
+                await asyncio.sleep(1)
 
 class MetricsManager:
     def __init__(self, config: Dict[str, Any]):
@@ -504,18 +680,30 @@ class HealthManager:
     
     async def _run_checks(self):
         """Run health checks periodically"""
+        loop = asyncio.get_running_loop()
+        
         while True:
+            started = loop.time()
+            
             try:
-                results = {}
+                names = list(self.checks)
+                outcomes = await asyncio.gather(
+                    *(
+                        asyncio.wait_for(self.checks[name](), timeout=5)
+                        for name in names
+                    ),
+                    return_exceptions=True
+                )
                 
-                for name, check in self.checks.items():
-                    try:
-                        results[name] = await check()
-                    except Exception as e:
+                results = {}
+                for name, outcome in zip(names, outcomes):
+                    if isinstance(outcome, BaseException):
                         results[name] = False
                         logging.error(
-                            f"Health check {name} failed: {e}"
+                            f"Health check {name} failed: {outcome!r}"
                         )
+                    else:
+                        results[name] = outcome
                 
                 self.is_healthy = all(results.values())
             
@@ -523,19 +711,70 @@ class HealthManager:
                 logging.error(f"Error running health checks: {e}")
                 self.is_healthy = False
             
-            await asyncio.sleep(10)
+            await asyncio.sleep(max(0, 10 - (loop.time() - started)))
+
+class Breaker:
+    __slots__ = (
+        'state', 'fails', 'opened_at', 'threshold', 'reset',
+        '_trial_in_flight'
+    )
+    
+    def __init__(self, threshold: int = 5, reset: float = 30.0):
+        self.state = "closed"
+        self.fails = 0
+        self.opened_at = 0.0
+        self.threshold = threshold
+        self.reset = reset
+        self._trial_in_flight = False
+    
+    def is_open(self) -> bool:
+        """Check whether calls should fail fast"""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset:
+                return True
+            self.state = "half_open"
+        
+        if self.state == "half_open":
+            # Let a single trial call through until it resolves
+            if self._trial_in_flight:
+                return True
+            self._trial_in_flight = True
+        return False
+    
+    def on_success(self):
+        """Record successful call"""
+        self.state = "closed"
+        self.fails = 0
+        self._trial_in_flight = False
+    
+    def on_cancel(self):
+        """Record call abandoned before it resolved"""
+        self._trial_in_flight = False
+    
+    def on_failure(self):
+        """Record failed call"""
+        self._trial_in_flight = False
+        self.fails += 1
+        if self.state == "half_open" or self.fails >= self.threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
 
 class CircuitBreaker:
-    def __init__(self):
-        self.states = {}
-    
-    @circuit
-    async def call(self,
-                  func: Callable,
-                  *args,
-                  **kwargs):
-        """Call function with circuit breaker"""
-        return await func(*args, **kwargs)
+    def __init__(self, threshold: int = 5, reset: float = 30.0):
+        self.threshold = threshold
+        self.reset = reset
+        self.breakers: Dict[tuple, Breaker] = {}
+    
+    def get_or_create(self, key: tuple) -> Breaker:
+        """Get breaker for key, creating it on first use"""
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = Breaker(self.threshold, self.reset)
+            self.breakers[key] = breaker
+        return breaker
+
+class CircuitOpenError(Exception):
+    pass
 
 class ServiceNotFoundError(Exception):
     pass
@@ -1,5 +1,6 @@
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, Callable
 import asyncio
+import functools
 import aiohttp
 import psutil
 import prometheus_client as prom
@@ -7,13 +8,13 @@ from prometheus_client import Counter, Gauge, Histogram, Summary
 import logging
 from datetime import datetime, timedelta
 import json
+import orjson
 import socket
 import aiomysql
-import aioredis
 import elasticsearch
+from elasticsearch.helpers import async_streaming_bulk
 from dataclasses import dataclass
 from enum import Enum
-import netifaces
 import docker
 import kubernetes
 import statsd
@@ -41,15 +42,67 @@ class Metric:
     timestamp: datetime
     description: str = ""
 
+def _read_metric_samples(metric: Union[Counter, Gauge]) -> List[tuple]:
+    """Read metric as (labels, value) pairs, one per labeled child"""
+    if metric._labelnames:
+        return [
+            (dict(zip(metric._labelnames, key)), child._value.get())
+            for key, child in list(metric._metrics.items())
+        ]
+    return [({}, metric._value.get())]
+
+class _TrackedMetric:
+    """Metric proxy marking its metric dirty on every update"""
+    __slots__ = ('_metric', '_name', '_mark_dirty')
+    
+    def __init__(self,
+                 metric: Union[Counter, Gauge],
+                 name: str,
+                 mark_dirty: Callable[[str], None]):
+        self._metric = metric
+        self._name = name
+        self._mark_dirty = mark_dirty
+    
+    def labels(self, *args, **kwargs) -> '_TrackedMetric':
+        """Get tracked child for label values"""
+        return _TrackedMetric(
+            self._metric.labels(*args, **kwargs),
+            self._name,
+            self._mark_dirty
+        )
+    
+    def inc(self, *args, **kwargs):
+        """Increment metric"""
+        self._metric.inc(*args, **kwargs)
+        self._mark_dirty(self._name)
+    
+    def dec(self, *args, **kwargs):
+        """Decrement gauge"""
+        self._metric.dec(*args, **kwargs)
+        self._mark_dirty(self._name)
+    
+    def set(self, *args, **kwargs):
+        """Set gauge"""
+        self._metric.set(*args, **kwargs)
+        self._mark_dirty(self._name)
+    
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._metric, attr)
+
 class MetricsCollector:
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self,
+                 config: Dict[str, Any],
+                 db_pool: Optional[aiomysql.Pool] = None):
         self.config = config
+        self.db_pool = db_pool
         self.storage = MetricsStorage(config['storage'])
         self.logger = logging.getLogger(__name__)
         
         # Initialize Prometheus metrics
         self.metrics = {}
+        self._dirty: set = set()
         self._setup_metrics()
+        self._setup_metric_children()
         
         # Initialize exporters
         self.exporters = []
@@ -58,6 +111,9 @@ class MetricsCollector:
         # System info
         self.hostname = socket.gethostname()
         self.ip_address = self._get_ip_address()
+        
+        # Prime CPU sampling so later non-blocking calls return deltas
+        psutil.cpu_percent(interval=None, percpu=True)
     
     def _setup_metrics(self):
         """Setup Prometheus metrics"""
@@ -110,18 +166,6 @@ class MetricsCollector:
             ['database']
         )
         
-        self.metrics['cache_hits'] = Counter(
-            'cache_hits_total',
-            'Total cache hits',
-            ['cache']
-        )
-        
-        self.metrics['cache_misses'] = Counter(
-            'cache_misses_total',
-            'Total cache misses',
-            ['cache']
-        )
-        
         # Business metrics
         self.metrics['business_transactions'] = Counter(
             'business_transactions_total',
@@ -134,6 +178,62 @@ class MetricsCollector:
             'Total business errors',
             ['type', 'code']
         )
+        
+        self._setup_descriptors()
+        
+        # Hand out tracking proxies so any update, by the collect methods
+        # or by application code, queues the metric for the next store
+        self._prom_metrics = self.metrics
+        self.metrics = {
+            name: (
+                _TrackedMetric(metric, name, self.mark_dirty)
+                if isinstance(metric, (Counter, Gauge)) else metric
+            )
+            for name, metric in self._prom_metrics.items()
+        }
+    
+    def _setup_descriptors(self):
+        """Precompute storage descriptors for counters and gauges"""
+        self._descriptors = {}
+        for name, metric in self.metrics.items():
+            if isinstance(metric, Counter):
+                metric_type = MetricType.COUNTER
+            elif isinstance(metric, Gauge):
+                metric_type = MetricType.GAUGE
+            else:
+                continue
+            
+            self._descriptors[name] = (
+                metric._name,
+                metric_type,
+                functools.partial(_read_metric_samples, metric)
+            )
+    
+    def _setup_metric_children(self):
+        """Resolve labeled system metric children up front"""
+        cpu_usage = self.metrics['system_cpu_usage']
+        self._cpu_children = [
+            cpu_usage.labels(cpu=f"cpu{i}")
+            for i in range(psutil.cpu_count())
+        ]
+        
+        memory_usage = self.metrics['system_memory_usage']
+        self._memory_children = {
+            memory_type: memory_usage.labels(type=memory_type)
+            for memory_type in ('total', 'used', 'free')
+        }
+        
+        network_io = self.metrics['system_network_io']
+        self._net_children = {
+            interface: (
+                network_io.labels(interface=interface, direction='sent'),
+                network_io.labels(interface=interface, direction='received')
+            )
+            for interface in psutil.net_if_addrs()
+        }
+        self._net_totals: Dict[str, tuple] = {}
+        
+        self._disk_children = {}
     
     def _setup_exporters(self):
         """Setup metric exporters"""
@@ -175,54 +275,74 @@ class MetricsCollector:
     
     async def _collect_system_metrics(self):
         """Collect system metrics"""
+        snapshot = await asyncio.to_thread(self._snapshot_system)
+        
         # CPU metrics
-        cpu_percent = psutil.cpu_percent(interval=1, percpu=True)
-        for i, percent in enumerate(cpu_percent):
-            self.metrics['system_cpu_usage'].labels(cpu=f"cpu{i}").set(percent)
+        for child, percent in zip(self._cpu_children, snapshot['cpu_percent']):
+            child.set(percent)
         
         # Memory metrics
-        memory = psutil.virtual_memory()
-        self.metrics['system_memory_usage'].labels(type='total').set(memory.total)
-        self.metrics['system_memory_usage'].labels(type='used').set(memory.used)
-        self.metrics['system_memory_usage'].labels(type='free').set(memory.free)
+        memory = snapshot['memory']
+        self._memory_children['total'].set(memory.total)
+        self._memory_children['used'].set(memory.used)
+        self._memory_children['free'].set(memory.free)
         
         # Disk metrics
-        for partition in psutil.disk_partitions():
-            usage = psutil.disk_usage(partition.mountpoint)
-            self.metrics['system_disk_usage'].labels(
-                device=partition.device,
-                mountpoint=partition.mountpoint
-            ).set(usage.used)
+        disk_usage = self.metrics['system_disk_usage']
+        for device, mountpoint, used in snapshot['disks']:
+            child = self._disk_children.get((device, mountpoint))
+            if child is None:
+                child = disk_usage.labels(
+                    device=device,
+                    mountpoint=mountpoint
+                )
+                self._disk_children[(device, mountpoint)] = child
+            child.set(used)
         
-        # Network metrics
-        net_io = psutil.net_io_counters(pernic=True)
-        for interface, counters in net_io.items():
-            self.metrics['system_network_io'].labels(
-                interface=interface,
-                direction='sent'
-            ).inc(counters.bytes_sent)
-            self.metrics['system_network_io'].labels(
-                interface=interface,
-                direction='received'
-            ).inc(counters.bytes_recv)
+        # Network metrics; counters only advance by the delta since the
+        # previous poll of each interface
+        network_io = self.metrics['system_network_io']
+        for interface, counters in snapshot['net_io'].items():
+            children = self._net_children.get(interface)
+            if children is None:
+                children = (
+                    network_io.labels(interface=interface, direction='sent'),
+                    network_io.labels(interface=interface, direction='received')
+                )
+                self._net_children[interface] = children
+            last = self._net_totals.get(interface)
+            if last is not None:
+                children[0].inc(max(0, counters.bytes_sent - last[0]))
+                children[1].inc(max(0, counters.bytes_recv - last[1]))
+            self._net_totals[interface] = (
+                counters.bytes_sent,
+                counters.bytes_recv
+            )
+    
+    def _snapshot_system(self) -> Dict[str, Any]:
+        """Read system counters; runs in a worker thread"""
+        return {
+            # Non-blocking: percentages since the previous call
+            'cpu_percent': psutil.cpu_percent(interval=None, percpu=True),
+            'memory': psutil.virtual_memory(),
+            'disks': [
+                (
+                    partition.device,
+                    partition.mountpoint,
+                    psutil.disk_usage(partition.mountpoint).used
+                )
+                for partition in psutil.disk_partitions()
+            ],
+            'net_io': psutil.net_io_counters(pernic=True)
+        }
     
     async def _collect_application_metrics(self):
         """Collect application metrics"""
         # Database metrics
-        pool = aiomysql.Pool  # Your database pool
-        self.metrics['db_connections'].labels(
-            database='mysql'
-        ).set(pool.size())
-        
-        # Cache metrics
-        redis = aioredis.Redis  # Your Redis client
-        info = await redis.info()
-        self.metrics['cache_hits'].labels(
-            cache='redis'
-        ).inc(int(info['keyspace_hits']))
-        self.metrics['cache_misses'].labels(
-            cache='redis'
-        ).inc(int(info['keyspace_misses']))
+        if self.db_pool is not None:
+            self.metrics['db_connections'].labels(
+                database='mysql'
+            ).set(self.db_pool.size)
     
     async def _collect_business_metrics(self):
         """Collect business metrics"""
@@ -230,56 +350,67 @@ class MetricsCollector:
         pass
     
     async def _store_metrics(self):
-        """Store collected metrics"""
+        """Store metrics updated since the last store"""
+        dirty, self._dirty = self._dirty, set()
+        timestamp = datetime.utcnow()
         metrics = []
         
-        for metric in self.metrics.values():
-            if isinstance(metric, (Counter, Gauge)):
+        for name in dirty:
+            descriptor = self._descriptors.get(name)
+            if descriptor is None:
+                continue
+            
+            metric_name, metric_type, getter = descriptor
+            for labels, value in getter():
                 metrics.append(Metric(
-                    name=metric._name,
-                    type=MetricType.COUNTER if isinstance(metric, Counter) \
-                        else MetricType.GAUGE,
+                    name=metric_name,
+                    type=metric_type,
                     level=MetricLevel.SYSTEM,
-                    value=metric._value.get(),
-                    labels=metric._labelnames,
-                    timestamp=datetime.utcnow()
+                    value=value,
+                    labels=labels,
+                    timestamp=timestamp
                 ))
         
         await self.storage.store_metrics(metrics)
     
+    def mark_dirty(self, name: str):
+        """Mark metric as updated so the next store includes it"""
+        self._dirty.add(name)
+    
     async def _export_metrics(self):
         """Export metrics to configured exporters"""
         for exporter in self.exporters:
             try:
-                await exporter.export(self.metrics)
+                await exporter.export(self._prom_metrics)
             except Exception as e:
                 self.logger.error(f"Failed to export metrics: {e}")
     
     def _get_ip_address(self) -> str:
         """Get primary IP address"""
-        interfaces = netifaces.interfaces()
-        
-        for interface in interfaces:
-            addresses = netifaces.ifaddresses(interface)
-            if netifaces.AF_INET in addresses:
-                for addr in addresses[netifaces.AF_INET]:
-                    ip = addr['addr']
-                    if not ip.startswith('127.'):
-                        return ip
-        
-        return '127.0.0.1'
+        # Connecting a UDP socket sends nothing but selects the
+        # outbound interface, whose address we read back
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.connect(('10.255.255.255', 1))
+            return sock.getsockname()[0]
+        except OSError:
+            return '127.0.0.1'
+        finally:
+            sock.close()
 
 class MetricsStorage:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.type = config['type']
+        self.logger = logging.getLogger(__name__)
         self._setup_storage()
     
     def _setup_storage(self):
         """Setup storage backend"""
         if self.type == 'elasticsearch':
             self.es = elasticsearch.AsyncElasticsearch(
-                self.config['elasticsearch_url']
+                self.config['elasticsearch_url'],
+                http_compress=True
             )
     
     async def store_metrics(self, metrics: List[Metric]):
@@ -289,16 +420,29 @@ class MetricsStorage:
     
     async def _store_elasticsearch(self, metrics: List[Metric]):
         """Store metrics in Elasticsearch"""
-        bulk_data = []
-        
+        async for ok, item in async_streaming_bulk(
+            self.es,
+            self._gen_actions(metrics),
+            chunk_size=1000,
+            max_chunk_bytes=10 * 1024 * 1024,
+            raise_on_error=False
+        ):
+            if not ok:
+                self.logger.error(f"Failed to store metric: {item}")
+    
+    def _gen_actions(self, metrics: List[Metric]):
+        """Generate bulk index actions for metrics"""
+        day = None
+        index = None
         for metric in metrics:
-            bulk_data.extend([
-                {
-                    "index": {
-                        "_index": f"metrics-{metric.timestamp:%Y.%m.%d}"
-                    }
-                },
-                {
+            # Metrics from one cycle share a day; format the index once
+            if metric.timestamp.date() != day:
+                day = metric.timestamp.date()
+                index = f"metrics-{day:%Y.%m.%d}"
+            
+            yield {
+                "_index": index,
+                "_source": {
                     "name": metric.name,
                     "type": metric.type.value,
                     "level": metric.level.value,
@@ -306,10 +450,7 @@ class MetricsStorage:
                     "labels": metric.labels,
                     "timestamp": metric.timestamp.isoformat()
                 }
-            ])
-        
-        if bulk_data:
-            await self.es.bulk(body=bulk_data)
+            }
 
 class PrometheusExporter:
     def __init__(self, config: Dict[str, Any]):
@@ -344,28 +485,39 @@ class ElasticsearchExporter:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.es = elasticsearch.AsyncElasticsearch(
-            config['url']
+            config['url'],
+            http_compress=True
         )
+        self._buffer = bytearray()
     
     async def export(self, metrics: Dict[str, Any]):
         """Export metrics to Elasticsearch"""
-        bulk_data = []
         timestamp = datetime.utcnow()
+        header = orjson.dumps({
+            'index': {'_index': f"metrics-{timestamp:%Y.%m.%d}"}
+        }) + b'\n'
+        iso_timestamp = timestamp.isoformat()
         
+        # Serialize NDJSON directly, reusing one buffer across cycles
+        buf = self._buffer
+        buf.clear()
         for name, metric in metrics.items():
-            bulk_data.extend([
-                {
-                    "index": {
-                        "_index": f"metrics-{timestamp:%Y.%m.%d}"
-                    }
-                },
-                {
-                    "name": name,
-                    "value": float(metric._value.get()),
-                    "type": metric.__class__.__name__.lower(),
-                    "timestamp": timestamp.isoformat()
-                }
-            ])
+            if not isinstance(metric, (Counter, Gauge)):
+                continue
+            metric_type = metric.__class__.__name__.lower()
+            for labels, value in _read_metric_samples(metric):
+                buf += header
+                buf += orjson.dumps({
+                    'name': name,
+                    'value': float(value),
+                    'labels': labels,
+                    'type': metric_type,
+                    'timestamp': iso_timestamp
+                })
+                buf += b'\n'
         
-        if bulk_data:
-            await self.es.bulk(body=bulk_data)
+        if buf:
+            await self.es.bulk(
+                body=bytes(buf),
+                headers={'content-type': 'application/x-ndjson'}
+            )
@@ -1,17 +1,20 @@
-from typing import Dict, Any, List, Optional, Union, Callable
+from typing import Dict, Any, List, NamedTuple, Optional, Union, Callable
 import asyncio
 import psutil
 import platform
 import json
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import aiohttp
 import logging
-from dataclasses import dataclass
 from enum import Enum
 import socket
+import time
 import aiodocker
-import uuid
-from collections import defaultdict
+import secrets
+from elasticsearch.helpers import async_bulk
+from agnes.utils.es_client import get_es_client, release_es_client
+from collections import defaultdict, deque
+import functools
 
 class MetricType(Enum):
     CPU = "cpu"
@@ -27,24 +30,21 @@ class AlertLevel(Enum):
     ERROR = "error"
     CRITICAL = "critical"
 
-@dataclass
-class MetricThreshold:
+class MetricThreshold(NamedTuple):
     warning: float
     error: float
     critical: float
     duration: int = 60  # seconds
     frequency: int = 3  # minimum occurrences
 
-@dataclass
-class Metric:
+class Metric(NamedTuple):
     name: str
     type: MetricType
     value: float
     timestamp: datetime
     labels: Optional[Dict[str, str]] = None
 
-@dataclass
-class Alert:
+class Alert(NamedTuple):
     id: str
     metric: str
     level: AlertLevel
@@ -54,13 +54,286 @@ class Alert:
     timestamp: datetime
     labels: Optional[Dict[str, str]] = None
 
+class ThresholdWindow:
+    """Rolling window of recent values with running violation counts"""
+    
+    def __init__(self, threshold: MetricThreshold):
+        self.threshold = threshold
+        self.samples = deque()
+        self.critical_violations = 0
+        self.error_violations = 0
+        self.warning_violations = 0
+    
+    def add(self, timestamp: datetime, value: float):
+        """Add sample to window"""
+        self.samples.append((timestamp, value))
+        self._count(value, 1)
+    
+    def expire(self, now: datetime):
+        """Drop samples older than threshold duration"""
+        samples = self.samples
+        duration = self.threshold.duration
+        while samples and (now - samples[0][0]).total_seconds() > duration:
+            _, value = samples.popleft()
+            self._count(value, -1)
+    
+    def _count(self, value: float, delta: int):
+        """Update violation counts for value"""
+        if value >= self.threshold.critical:
+            self.critical_violations += delta
+        if value >= self.threshold.error:
+            self.error_violations += delta
+        if value >= self.threshold.warning:
+            self.warning_violations += delta
+
+def _sync_collect_cpu(timestamp: datetime,
+                      host_label: Dict[str, str],
+                      cpu_percent: float) -> List[Metric]:
+    """Collect CPU metrics"""
+    metrics = []
+    
+    # CPU usage
+    metrics.append(Metric(
+        name="system_cpu_usage",
+        type=MetricType.CPU,
+        value=cpu_percent,
+        timestamp=timestamp,
+        labels=host_label
+    ))
+    
+    # CPU load
+    load1, load5, load15 = psutil.getloadavg()
+    metrics.extend([
+        Metric(
+            name="system_load_1",
+            type=MetricType.CPU,
+            value=load1,
+            timestamp=timestamp,
+            labels=host_label
+        ),
+        Metric(
+            name="system_load_5",
+            type=MetricType.CPU,
+            value=load5,
+            timestamp=timestamp,
+            labels=host_label
+        ),
+        Metric(
+            name="system_load_15",
+            type=MetricType.CPU,
+            value=load15,
+            timestamp=timestamp,
+            labels=host_label
+        )
+    ])
+    
+    return metrics
+
+def _sync_collect_memory(timestamp: datetime,
+                         host_label: Dict[str, str]) -> List[Metric]:
+    """Collect memory metrics"""
+    metrics = []
+    
+    memory = psutil.virtual_memory()
+    metrics.extend([
+        Metric(
+            name="system_memory_total",
+            type=MetricType.MEMORY,
+            value=memory.total,
+            timestamp=timestamp,
+            labels=host_label
+        ),
+        Metric(
+            name="system_memory_used",
+            type=MetricType.MEMORY,
+            value=memory.used,
+            timestamp=timestamp,
+            labels=host_label
+        ),
+        Metric(
+            name="system_memory_percent",
+            type=MetricType.MEMORY,
+            value=memory.percent,
+            timestamp=timestamp,
+            labels=host_label
+        )
+    ])
+    
+    swap = psutil.swap_memory()
+    metrics.extend([
+        Metric(
+            name="system_swap_total",
+            type=MetricType.MEMORY,
+            value=swap.total,
+            timestamp=timestamp,
+            labels=host_label
+        ),
+        Metric(
+            name="system_swap_used",
+            type=MetricType.MEMORY,
+            value=swap.used,
+            timestamp=timestamp,
+            labels=host_label
+        ),
+        Metric(
+            name="system_swap_percent",
+            type=MetricType.MEMORY,
+            value=swap.percent,
+            timestamp=timestamp,
+            labels=host_label
+        )
+    ])
+    
+    return metrics
+
+def _sync_collect_disk(timestamp: datetime,
+                       hostname: str,
+                       partitions: List[Any],
+                       logger: logging.Logger) -> List[Metric]:
+    """Collect disk metrics"""
+    metrics = []
+    
+    for partition in partitions:
+        try:
+            usage = psutil.disk_usage(partition.mountpoint)
+            labels = {
+                'host': hostname,
+                'device': partition.device,
+                'mountpoint': partition.mountpoint
+            }
+            metrics.extend([
+                Metric(
+                    name="system_disk_total",
+                    type=MetricType.DISK,
+                    value=usage.total,
+                    timestamp=timestamp,
+                    labels=labels
+                ),
+                Metric(
+                    name="system_disk_used",
+                    type=MetricType.DISK,
+                    value=usage.used,
+                    timestamp=timestamp,
+                    labels=labels
+                ),
+                Metric(
+                    name="system_disk_percent",
+                    type=MetricType.DISK,
+                    value=usage.percent,
+                    timestamp=timestamp,
+                    labels=labels
+                )
+            ])
+        except Exception as e:
+            logger.error(
+                f"Error collecting disk metrics for {partition.mountpoint}: {e}"
+            )
+    
+    return metrics
+
+def _sync_collect_network(timestamp: datetime,
+                          host_label: Dict[str, str]) -> List[Metric]:
+    """Collect network metrics"""
+    metrics = []
+    
+    net_io = psutil.net_io_counters()
+    metrics.extend([
+        Metric(
+            name="system_network_bytes_sent",
+            type=MetricType.NETWORK,
+            value=net_io.bytes_sent,
+            timestamp=timestamp,
+            labels=host_label
+        ),
+        Metric(
+            name="system_network_bytes_recv",
+            type=MetricType.NETWORK,
+            value=net_io.bytes_recv,
+            timestamp=timestamp,
+            labels=host_label
+        ),
+        Metric(
+            name="system_network_packets_sent",
+            type=MetricType.NETWORK,
+            value=net_io.packets_sent,
+            timestamp=timestamp,
+            labels=host_label
+        ),
+        Metric(
+            name="system_network_packets_recv",
+            type=MetricType.NETWORK,
+            value=net_io.packets_recv,
+            timestamp=timestamp,
+            labels=host_label
+        )
+    ])
+    
+    return metrics
+
+def _sync_collect_process(timestamp: datetime,
+                          hostname: str) -> List[Metric]:
+    """Collect process metrics"""
+    metrics = []
+    
+    for proc in psutil.process_iter(['pid']):
+        try:
+            # Serve all /proc reads for this process from one snapshot
+            with proc.oneshot():
+                labels = {
+                    'host': hostname,
+                    'pid': str(proc.info['pid']),
+                    'name': proc.name()
+                }
+                metrics.extend([
+                    Metric(
+                        name="system_process_cpu",
+                        type=MetricType.PROCESS,
+                        value=proc.cpu_percent(),
+                        timestamp=timestamp,
+                        labels=labels
+                    ),
+                    Metric(
+                        name="system_process_memory",
+                        type=MetricType.PROCESS,
+                        value=proc.memory_percent(),
+                        timestamp=timestamp,
+                        labels=labels
+                    )
+                ])
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    
+    return metrics
+
 class SystemMonitor:
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self,
+                 config: Dict[str, Any],
+                 store: Optional['MetricStore'] = None):
         self.config = config
+        self.store = store
         self.hostname = socket.gethostname()
+        self._host_label = {'host': self.hostname}
         self.docker = None
+        self._partitions = psutil.disk_partitions(all=False)
+        self._cycle = 0
+        
+        # Prime CPU sampling so later non-blocking calls return deltas
+        self._cpu_percent = psutil.cpu_percent(interval=None)
+        self._last_cpu_sample = time.monotonic()
         self.thresholds: Dict[str, MetricThreshold] = {}
-        self.history: Dict[str, List[Metric]] = defaultdict(list)
+        self._windows: Dict[str, ThresholdWindow] = {}
+        # Fixed-size ring buffer per metric series; keyed by name and
+        # labels, each series gains one sample per cycle, so the oldest
+        # entry is evicted on append once retention is covered
+        retention_hours = config.get('history_retention_hours', 24)
+        max_samples = config.get(
+            'history_max_samples',
+            int(retention_hours * 3600 // config.get('collection_interval', 10))
+        )
+        self._cutoff_delta = timedelta(hours=retention_hours)
+        self.history: Dict[tuple, deque] = defaultdict(
+            functools.partial(deque, maxlen=max_samples)
+        )
         self.alert_handlers: List[Callable[[Alert], Any]] = []
         self.logger = logging.getLogger(__name__)
     
@@ -85,258 +358,85 @@ class SystemMonitor:
     
     async def _collect_metrics(self):
         """Collect system metrics"""
-        timestamp = datetime.utcnow()
-        
-        # Collect CPU metrics
-        cpu_metrics = await self._collect_cpu_metrics(timestamp)
-        for metric in cpu_metrics:
-            await self._process_metric(metric)
-        
-        # Collect memory metrics
-        memory_metrics = await self._collect_memory_metrics(timestamp)
-        for metric in memory_metrics:
-            await self._process_metric(metric)
+        timestamp = datetime.now(timezone.utc)
+        self._cycle += 1
+        
+        collectors = [
+            self._collect_cpu_metrics(timestamp),
+            self._collect_memory_metrics(timestamp),
+            self._collect_disk_metrics(timestamp),
+            self._collect_network_metrics(timestamp),
+            self._collect_process_metrics(timestamp)
+        ]
+        if self.docker:
+            collectors.append(self._collect_docker_metrics(timestamp))
         
-        # Collect disk metrics
-        disk_metrics = await self._collect_disk_metrics(timestamp)
-        for metric in disk_metrics:
-            await self._process_metric(metric)
+        # Run collectors concurrently so Docker I/O overlaps the rest
+        results = await asyncio.gather(*collectors, return_exceptions=True)
         
-        # Collect network metrics
-        network_metrics = await self._collect_network_metrics(timestamp)
-        for metric in network_metrics:
-            await self._process_metric(metric)
+        batch = []
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.error(f"Error collecting metrics: {result}")
+                continue
+            for metric in result:
+                await self._process_metric(metric, timestamp)
+            batch.extend(result)
         
-        # Collect process metrics
-        process_metrics = await self._collect_process_metrics(timestamp)
-        for metric in process_metrics:
-            await self._process_metric(metric)
+        # Drop series that stopped reporting, such as exited processes
+        if self._cycle % self.config.get('history_sweep_cycles', 60) == 0:
+            self._sweep_history(timestamp)
         
-        # Collect Docker metrics
-        if self.docker:
-            docker_metrics = await self._collect_docker_metrics(timestamp)
-            for metric in docker_metrics:
-                await self._process_metric(metric)
+        # Flush the whole cycle to storage in one request
+        if self.store and batch:
+            await self.store.store_metric(batch)
     
     async def _collect_cpu_metrics(self, timestamp: datetime) -> List[Metric]:
         """Collect CPU metrics"""
-        metrics = []
-        
-        # CPU usage
-        cpu_percent = psutil.cpu_percent(interval=1)
-        metrics.append(Metric(
-            name="system_cpu_usage",
-            type=MetricType.CPU,
-            value=cpu_percent,
-            timestamp=timestamp,
-            labels={'host': self.hostname}
-        ))
-        
-        # CPU load
-        load1, load5, load15 = psutil.getloadavg()
-        metrics.extend([
-            Metric(
-                name="system_load_1",
-                type=MetricType.CPU,
-                value=load1,
-                timestamp=timestamp,
-                labels={'host': self.hostname}
-            ),
-            Metric(
-                name="system_load_5",
-                type=MetricType.CPU,
-                value=load5,
-                timestamp=timestamp,
-                labels={'host': self.hostname}
-            ),
-            Metric(
-                name="system_load_15",
-                type=MetricType.CPU,
-                value=load15,
-                timestamp=timestamp,
-                labels={'host': self.hostname}
-            )
-        ])
-        
-        return metrics
+        # Reuse the last sample when called faster than psutil can resolve
+        now = time.monotonic()
+        if now - self._last_cpu_sample >= \
+                self.config.get('cpu_sample_min_interval', 0.1):
+            self._cpu_percent = psutil.cpu_percent(interval=None)
+            self._last_cpu_sample = now
+        
+        return await asyncio.to_thread(
+            _sync_collect_cpu, timestamp, self._host_label, self._cpu_percent
+        )
     
     async def _collect_memory_metrics(self, timestamp: datetime) -> List[Metric]:
         """Collect memory metrics"""
-        metrics = []
-        
-        memory = psutil.virtual_memory()
-        metrics.extend([
-            Metric(
-                name="system_memory_total",
-                type=MetricType.MEMORY,
-                value=memory.total,
-                timestamp=timestamp,
-                labels={'host': self.hostname}
-            ),
-            Metric(
-                name="system_memory_used",
-                type=MetricType.MEMORY,
-                value=memory.used,
-                timestamp=timestamp,
-                labels={'host': self.hostname}
-            ),
-            Metric(
-                name="system_memory_percent",
-                type=MetricType.MEMORY,
-                value=memory.percent,
-                timestamp=timestamp,
-                labels={'host': self.hostname}
-            )
-        ])
-        
-        swap = psutil.swap_memory()
-        metrics.extend([
-            Metric(
-                name="system_swap_total",
-                type=MetricType.MEMORY,
-                value=swap.total,
-                timestamp=timestamp,
-                labels={'host': self.hostname}
-            ),
-            Metric(
-                name="system_swap_used",
-                type=MetricType.MEMORY,
-                value=swap.used,
-                timestamp=timestamp,
-                labels={'host': self.hostname}
-            ),
-            Metric(
-                name="system_swap_percent",
-                type=MetricType.MEMORY,
-                value=swap.percent,
-                timestamp=timestamp,
-                labels={'host': self.hostname}
-            )
-        ])
-        
-        return metrics
+        return await asyncio.to_thread(
+            _sync_collect_memory, timestamp, self._host_label
+        )
     
     async def _collect_disk_metrics(self, timestamp: datetime) -> List[Metric]:
         """Collect disk metrics"""
-        metrics = []
-        
-        for partition in psutil.disk_partitions():
-            try:
-                usage = psutil.disk_usage(partition.mountpoint)
-                metrics.extend([
-                    Metric(
-                        name="system_disk_total",
-                        type=MetricType.DISK,
-                        value=usage.total,
-                        timestamp=timestamp,
-                        labels={
-                            'host': self.hostname,
-                            'device': partition.device,
-                            'mountpoint': partition.mountpoint
-                        }
-                    ),
-                    Metric(
-                        name="system_disk_used",
-                        type=MetricType.DISK,
-                        value=usage.used,
-                        timestamp=timestamp,
-                        labels={
-                            'host': self.hostname,
-                            'device': partition.device,
-                            'mountpoint': partition.mountpoint
-                        }
-                    ),
-                    Metric(
-                        name="system_disk_percent",
-                        type=MetricType.DISK,
-                        value=usage.percent,
-                        timestamp=timestamp,
-                        labels={
-                            'host': self.hostname,
-                            'device': partition.device,
-                            'mountpoint': partition.mountpoint
-                        }
-                    )
-                ])
-            except Exception as e:
-                self.logger.error(
-                    f"Error collecting disk metrics for {partition.mountpoint}: {e}"
-                )
+        # Mounts rarely change, so only re-read them periodically
+        if self._cycle % self.config.get('partition_refresh_cycles', 60) == 0:
+            self._partitions = await asyncio.to_thread(
+                psutil.disk_partitions, False
+            )
         
-        return metrics
+        return await asyncio.to_thread(
+            _sync_collect_disk,
+            timestamp,
+            self.hostname,
+            self._partitions,
+            self.logger
+        )
     
     async def _collect_network_metrics(self, timestamp: datetime) -> List[Metric]:
         """Collect network metrics"""
-        metrics = []
-        
-        net_io = psutil.net_io_counters()
-        metrics.extend([
-            Metric(
-                name="system_network_bytes_sent",
-                type=MetricType.NETWORK,
-                value=net_io.bytes_sent,
-                timestamp=timestamp,
-                labels={'host': self.hostname}
-            ),
-            Metric(
-                name="system_network_bytes_recv",
-                type=MetricType.NETWORK,
-                value=net_io.bytes_recv,
-                timestamp=timestamp,
-                labels={'host': self.hostname}
-            ),
-            Metric(
-                name="system_network_packets_sent",
-                type=MetricType.NETWORK,
-                value=net_io.packets_sent,
-                timestamp=timestamp,
-                labels={'host': self.hostname}
-            ),
-            Metric(
-                name="system_network_packets_recv",
-                type=MetricType.NETWORK,
-                value=net_io.packets_recv,
-                timestamp=timestamp,
-                labels={'host': self.hostname}
-            )
-        ])
-        
-        return metrics
+        return await asyncio.to_thread(
+            _sync_collect_network, timestamp, self._host_label
+        )
     
     async def _collect_process_metrics(self, timestamp: datetime) -> List[Metric]:
         """Collect process metrics"""
-        metrics = []
-        
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-            try:
-                metrics.extend([
-                    Metric(
-                        name="system_process_cpu",
-                        type=MetricType.PROCESS,
-                        value=proc.info['cpu_percent'],
-                        timestamp=timestamp,
-                        labels={
-                            'host': self.hostname,
-                            'pid': str(proc.info['pid']),
-                            'name': proc.info['name']
-                        }
-                    ),
-                    Metric(
-                        name="system_process_memory",
-                        type=MetricType.PROCESS,
-                        value=proc.info['memory_percent'],
-                        timestamp=timestamp,
-                        labels={
-                            'host': self.hostname,
-                            'pid': str(proc.info['pid']),
-                            'name': proc.info['name']
-                        }
-                    )
-                ])
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-        
-        return metrics
+        return await asyncio.to_thread(
+            _sync_collect_process, timestamp, self.hostname
+        )
     
     async def _collect_docker_metrics(self, timestamp: datetime) -> List[Metric]:
         """Collect Docker metrics"""
@@ -344,10 +444,35 @@ class SystemMonitor:
         
         try:
             containers = await self.docker.containers.list()
-            for container in containers:
-                stats = await container.stats(stream=False)
+            
+            # Fetch stats concurrently, bounded to spare the daemon socket
+            semaphore = asyncio.Semaphore(
+                self.config.get('docker_stats_concurrency', 32)
+            )
+            
+            async def _stats(container):
+                async with semaphore:
+                    return await container.stats(stream=False)
+            
+            stats_list = await asyncio.gather(
+                *(_stats(container) for container in containers),
+                return_exceptions=True
+            )
+            
+            for container, stats in zip(containers, stats_list):
+                if isinstance(stats, Exception):
+                    self.logger.error(
+                        f"Error collecting Docker stats for "
+                        f"{container.id[:12]}: {stats}"
+                    )
+                    continue
                 if stats:
                     stats = stats[0]  # Get first stats entry
+                    labels = {
+                        'host': self.hostname,
+                        'container': container.id[:12],
+                        'name': container.name
+                    }
                     
                     # CPU stats
                     cpu_delta = stats['cpu_stats']['cpu_usage']['total_usage'] - \
@@ -363,11 +488,7 @@ class SystemMonitor:
                         type=MetricType.CPU,
                         value=cpu_percent,
                         timestamp=timestamp,
-                        labels={
-                            'host': self.hostname,
-                            'container': container.id[:12],
-                            'name': container.name
-                        }
+                        labels=labels
                     ))
                     
                     # Memory stats
@@ -380,11 +501,7 @@ class SystemMonitor:
                         type=MetricType.MEMORY,
                         value=mem_percent,
                         timestamp=timestamp,
-                        labels={
-                            'host': self.hostname,
-                            'container': container.id[:12],
-                            'name': container.name
-                        }
+                        labels=labels
                     ))
         
         except Exception as e:
@@ -392,83 +509,82 @@ class SystemMonitor:
         
         return metrics
     
-    async def _process_metric(self, metric: Metric):
+    async def _process_metric(self, metric: Metric, now: datetime):
         """Process collected metric"""
-        # Store metric in history
-        self.history[metric.name].append(metric)
+        # Store metric in its series history
+        labels = frozenset(metric.labels.items() if metric.labels else ())
+        self.history[(metric.name, labels)].append(metric)
         
-        # Cleanup old metrics
-        cutoff = datetime.utcnow() - timedelta(
-            hours=self.config.get('history_retention_hours', 24)
-        )
-        self.history[metric.name] = [
-            m for m in self.history[metric.name]
-            if m.timestamp > cutoff
-        ]
+        # Nothing to alert on for most metrics
+        if metric.name not in self.thresholds:
+            return
         
-        # Check thresholds
-        if metric.name in self.thresholds:
-            await self._check_thresholds(metric)
+        await self._check_thresholds(metric, now)
+    
+    def _sweep_history(self, now: datetime):
+        """Remove series whose latest sample is past retention"""
+        cutoff = now - self._cutoff_delta
+        stale = [
+            key for key, history in self.history.items()
+            if not history or history[-1].timestamp <= cutoff
+        ]
+        for key in stale:
+            del self.history[key]
     
-    async def _check_thresholds(self, metric: Metric):
+    async def _check_thresholds(self, metric: Metric, now: datetime):
         """Check metric thresholds and generate alerts"""
         threshold = self.thresholds[metric.name]
-        recent_metrics = [
-            m for m in self.history[metric.name]
-            if (datetime.utcnow() - m.timestamp).total_seconds() <= threshold.duration
-        ]
+        window = self._windows[metric.name]
+        window.add(metric.timestamp, metric.value)
+        window.expire(now)
         
-        if len(recent_metrics) < threshold.frequency:
+        if len(window.samples) < threshold.frequency:
             return
         
-        violations = [
-            m for m in recent_metrics
-            if m.value >= threshold.critical
-        ]
-        if len(violations) >= threshold.frequency:
+        if window.critical_violations >= threshold.frequency:
             await self._generate_alert(
                 metric,
                 AlertLevel.CRITICAL,
-                threshold.critical
+                threshold.critical,
+                now
             )
             return
         
-        violations = [
-            m for m in recent_metrics
-            if m.value >= threshold.error
-        ]
-        if len(violations) >= threshold.frequency:
+        if window.error_violations >= threshold.frequency:
             await self._generate_alert(
                 metric,
                 AlertLevel.ERROR,
-                threshold.error
+                threshold.error,
+                now
             )
             return
         
-        violations = [
-            m for m in recent_metrics
-            if m.value >= threshold.warning
-        ]
-        if len(violations) >= threshold.frequency:
+        if window.warning_violations >= threshold.frequency:
             await self._generate_alert(
                 metric,
                 AlertLevel.WARNING,
-                threshold.warning
+                threshold.warning,
+                now
             )
     
     async def _generate_alert(self,
                             metric: Metric,
                             level: AlertLevel,
-                            threshold: float):
+                            threshold: float,
+                            now: datetime):
         """Generate and send alert"""
+        # Windows stay current without handlers; only dispatch is skipped
+        if not self.alert_handlers:
+            return
+        
         alert = Alert(
-            id=str(uuid.uuid4()),
+            id=secrets.token_hex(16),
             metric=metric.name,
             level=level,
             message=f"{metric.name} exceeds {level.value} threshold",
             value=metric.value,
             threshold=threshold,
-            timestamp=datetime.utcnow(),
+            timestamp=now,
             labels=metric.labels
         )
         
@@ -493,6 +609,7 @@ class SystemMonitor:
             duration=duration,
             frequency=frequency
         )
+        self._windows[metric] = ThresholdWindow(self.thresholds[metric])
     
     def add_alert_handler(self, handler: Callable[[Alert], Any]):
         """Add alert handler"""
@@ -514,9 +631,11 @@ class MetricStore:
         else:
             self.storage = MemoryMetricStorage()
     
-    async def store_metric(self, metric: Metric):
-        """Store metric"""
-        await self.storage.store(metric)
+    async def store_metric(self, metric: Union[Metric, List[Metric]]):
+        """Store metric or batch of metrics"""
+        if isinstance(metric, Metric):
+            metric = [metric]
+        await self.storage.store_many(metric)
     
     async def query_metrics(self,
                           name: str,
@@ -525,6 +644,10 @@ class MetricStore:
                           labels: Optional[Dict[str, str]] = None) -> List[Metric]:
         """Query metrics"""
         return await self.storage.query(name, start_time, end_time, labels)
+    
+    async def close(self):
+        """Close metric storage"""
+        await self.storage.close()
 
 class MemoryMetricStorage:
     def __init__(self):
@@ -534,6 +657,14 @@ class MemoryMetricStorage:
         """Store metric in memory"""
         self.metrics[metric.name].append(metric)
     
+    async def store_many(self, metrics: List[Metric]):
+        """Store batch of metrics in memory"""
+        for metric in metrics:
+            self.metrics[metric.name].append(metric)
+    
+    async def close(self):
+        """Nothing to release for memory storage"""
+    
     async def query(self,
                    name: str,
                    start_time: datetime,
@@ -553,12 +684,13 @@ class MemoryMetricStorage:
 class ElasticsearchMetricStorage:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
-        self.client = AsyncElasticsearch([config['url']])
+        self.client = get_es_client(config['url'])
+        self._index_fmt = "metrics-{}".format
     
     async def store(self, metric: Metric):
         """Store metric in Elasticsearch"""
         await self.client.index(
-            index=f"metrics-{metric.name}",
+            index=self._index_fmt(metric.name),
             body={
                 'timestamp': metric.timestamp.isoformat(),
                 'value': metric.value,
@@ -567,37 +699,52 @@ class ElasticsearchMetricStorage:
             }
         )
     
+    async def store_many(self, metrics: List[Metric]):
+        """Store batch of metrics in Elasticsearch"""
+        index_fmt = self._index_fmt
+        actions = (
+            {
+                '_index': index_fmt(metric.name),
+                '_source': {
+                    'timestamp': metric.timestamp.isoformat(),
+                    'value': metric.value,
+                    'type': metric.type.value,
+                    'labels': metric.labels or {}
+                }
+            }
+            for metric in metrics
+        )
+        await async_bulk(self.client, actions)
+    
+    async def close(self):
+        """Release shared Elasticsearch client"""
+        await release_es_client(self.config['url'])
+    
     async def query(self,
                    name: str,
                    start_time: datetime,
                    end_time: datetime,
                    labels: Optional[Dict[str, str]] = None) -> List[Metric]:
         """Query metrics from Elasticsearch"""
-        query = {
-            'bool': {
-                'must': [
-                    {
-                        'range': {
-                            'timestamp': {
-                                'gte': start_time.isoformat(),
-                                'lte': end_time.isoformat()
-                            }
-                        }
-                    }
-                ]
+        # Only the leaves vary per call; build them straight into the
+        # clause list instead of copying a template
+        must = [{
+            'range': {
+                'timestamp': {
+                    'gte': start_time.isoformat(),
+                    'lte': end_time.isoformat()
+                }
             }
-        }
-        
+        }]
         if labels:
-            for key, value in labels.items():
-                query['bool']['must'].append({
-                    'term': {
-                        f'labels.{key}': value
-                    }
-                })
+            must.extend(
+                {'term': {f'labels.{key}': value}}
+                for key, value in labels.items()
+            )
+        query = {'bool': {'must': must}}
         
         result = await self.client.search(
-            index=f"metrics-{name}",
+            index=self._index_fmt(name),
             body={'query': query}
         )
         
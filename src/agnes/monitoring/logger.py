@@ -1,9 +1,9 @@
 import logging
-import json
+import orjson
 from typing import Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 import asyncio
-from elasticsearch import AsyncElasticsearch
+from agnes.utils.es_client import get_es_client, release_es_client
 from opencensus.ext.prometheus import prometheus_metrics
 from prometheus_client import Counter, Histogram, Gauge
 
@@ -48,7 +48,8 @@ class MetricsCollector:
 
 class ElasticSearchHandler:
     def __init__(self, config: Dict[str, Any]):
-        self.es = AsyncElasticsearch([config['elasticsearch_url']])
+        self.es_url = config['elasticsearch_url']
+        self.es = get_es_client(self.es_url)
         self.index_prefix = config.get('index_prefix', 'agnes-logs-')
     
     async def store_log(self, log_data: Dict[str, Any]):
@@ -61,7 +62,7 @@ class ElasticSearchHandler:
     
     async def close(self):
         """Close Elasticsearch connection"""
-        await self.es.close()
+        await release_es_client(self.es_url)
 
 class StructuredLogger:
     def __init__(self, config: Dict[str, Any]):
@@ -81,17 +82,17 @@ class StructuredLogger:
                        data: Dict[str, Any],
                        context: Optional[Dict[str, Any]] = None):
         """Log structured event"""
-        timestamp = datetime.utcnow().isoformat()
-        
         log_entry = {
-            'timestamp': timestamp,
+            'timestamp': datetime.now(timezone.utc),
             'event_type': event_type,
             'data': data,
             'context': context or {}
         }
         
         # Log to file
-        self.logger.info(json.dumps(log_entry))
+        self.logger.info(
+            orjson.dumps(log_entry, option=orjson.OPT_UTC_Z).decode()
+        )
         
         # Store in Elasticsearch
         await self.es_handler.store_log(log_entry)
@@ -2,10 +2,12 @@ from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 import time
 import asyncio
+import gzip
 import psutil
 import prometheus_client as prom
 from prometheus_client.core import CollectorRegistry
-from prometheus_client import start_http_server
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from aiohttp import web
 import functools
 
 @dataclass
@@ -21,6 +23,7 @@ class MetricsCollector:
     def __init__(self):
         self.registry = CollectorRegistry()
         self.metrics: Dict[str, Any] = {}
+        self._labeled: Dict[tuple, Any] = {}
     
     def create_metric(self, config: MetricConfig):
         """Create a new metric based on configuration"""
@@ -56,29 +59,44 @@ class MetricsCollector:
         """Get existing metric by name"""
         return self.metrics.get(name)
     
+    def labeled(self, name: str, *label_values: str) -> Any:
+        """Get labeled child of metric, cached after first use"""
+        key = (name, label_values)
+        child = self._labeled.get(key)
+        if child is None:
+            child = self._labeled[key] = \
+                self.metrics[name].labels(*label_values)
+        return child
+    
     def measure_time(self, metric_name: str):
         """Decorator to measure function execution time"""
         def decorator(func):
+            # Resolve metrics once rather than on every call
+            metric = self.metrics[metric_name]
+            errors = self.metrics.get(f"{metric_name}_errors")
+            
             @functools.wraps(func)
             async def async_wrapper(*args, **kwargs):
-                start_time = time.time()
+                start_time = time.perf_counter()
                 try:
                     result = await func(*args, **kwargs)
-                    self.metrics[metric_name].observe(time.time() - start_time)
+                    metric.observe(time.perf_counter() - start_time)
                     return result
                 except Exception as e:
-                    self.metrics[f"{metric_name}_errors"].inc()
+                    if errors is not None:
+                        errors.inc()
                     raise e
             
             @functools.wraps(func)
             def sync_wrapper(*args, **kwargs):
-                start_time = time.time()
+                start_time = time.perf_counter()
                 try:
                     result = func(*args, **kwargs)
-                    self.metrics[metric_name].observe(time.time() - start_time)
+                    metric.observe(time.perf_counter() - start_time)
                     return result
                 except Exception as e:
-                    self.metrics[f"{metric_name}_errors"].inc()
+                    if errors is not None:
+                        errors.inc()
                     raise e
             
             return async_wrapper if asyncio.iscoroutinefunction(func) else sync_wrapper
@@ -87,6 +105,9 @@ class MetricsCollector:
 class SystemMetricsCollector:
     def __init__(self, collector: MetricsCollector):
         self.collector = collector
+        self._partitions = psutil.disk_partitions()
+        self._ticks = 0
+        self._last_net = None
         self._setup_metrics()
     
     def _setup_metrics(self):
@@ -121,32 +142,45 @@ class SystemMetricsCollector:
     
     async def collect_metrics(self):
         """Collect system metrics"""
+        loop = asyncio.get_running_loop()
+        next_deadline = loop.time()
+        
+        cpu_usage = self.collector.get_metric("system_cpu_usage")
+        memory_usage = self.collector.get_metric("system_memory_usage")
+        bytes_sent = self.collector.labeled("system_network_bytes", "sent")
+        bytes_recv = self.collector.labeled("system_network_bytes", "received")
+        
         while True:
             # CPU metrics
-            cpu_percent = psutil.cpu_percent()
-            self.collector.get_metric("system_cpu_usage").set(cpu_percent)
+            cpu_usage.set(psutil.cpu_percent())
             
             # Memory metrics
-            memory = psutil.virtual_memory()
-            self.collector.get_metric("system_memory_usage").set(memory.used)
+            memory_usage.set(psutil.virtual_memory().used)
             
-            # Disk metrics
-            for partition in psutil.disk_partitions():
+            # Disk metrics; mounts rarely change so refresh them lazily
+            self._ticks += 1
+            if self._ticks % 20 == 0:
+                self._partitions = psutil.disk_partitions()
+            for partition in self._partitions:
                 usage = psutil.disk_usage(partition.mountpoint)
-                self.collector.get_metric("system_disk_usage").labels(
+                self.collector.labeled(
+                    "system_disk_usage",
                     partition.mountpoint
                 ).set(usage.percent)
             
-            # Network metrics
+            # Network metrics; counters only advance by the delta since
+            # the previous poll
             net_io = psutil.net_io_counters()
-            self.collector.get_metric("system_network_bytes").labels(
-                "sent"
-            ).inc(net_io.bytes_sent)
-            self.collector.get_metric("system_network_bytes").labels(
-                "received"
-            ).inc(net_io.bytes_recv)
+            if self._last_net is not None:
+                last_sent, last_recv = self._last_net
+                bytes_sent.inc(max(0, net_io.bytes_sent - last_sent))
+                bytes_recv.inc(max(0, net_io.bytes_recv - last_recv))
+            self._last_net = (net_io.bytes_sent, net_io.bytes_recv)
             
-            await asyncio.sleep(15)  # Collect every 15 seconds
+            # Collect every 15 seconds against absolute deadlines so
+            # collection time does not accumulate as drift
+            next_deadline += 15.0
+            await asyncio.sleep(max(0, next_deadline - loop.time()))
 
 class ApplicationMetricsCollector:
     def __init__(self, collector: MetricsCollector):
@@ -193,14 +227,51 @@ class MetricsServer:
         self.collector = collector
         self.host = host
         self.port = port
+        self.runner: Optional[web.AppRunner] = None
+        self.cache_ttl = 0.1
+        self._body: Optional[bytes] = None
+        self._gzipped: Optional[bytes] = None
+        self._cached_at = 0.0
     
     async def start(self):
         """Start metrics server"""
-        start_http_server(
-            port=self.port,
-            addr=self.host,
-            registry=self.collector.registry
-        )
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle_metrics)
+        
+        # Serve scrapes on the running loop so they don't queue behind
+        # prometheus_client's single-threaded HTTP server
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+    
+    async def stop(self):
+        """Stop metrics server"""
+        if self.runner:
+            await self.runner.cleanup()
+    
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        """Handle metrics endpoint"""
+        # Scrapers arriving together share one rendering of the registry
+        now = time.monotonic()
+        if self._body is None or now - self._cached_at >= self.cache_ttl:
+            self._body = await asyncio.to_thread(
+                generate_latest,
+                self.collector.registry
+            )
+            self._gzipped = None
+            self._cached_at = now
+        
+        headers = {'Content-Type': CONTENT_TYPE_LATEST}
+        body = self._body
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            if self._gzipped is None:
+                self._gzipped = gzip.compress(body, compresslevel=1)
+            body = self._gzipped
+            headers['Content-Encoding'] = 'gzip'
+        
+        return web.Response(body=body, headers=headers)
 
 class MonitoringManager:
     def __init__(self, config: Dict[str, Any]):
@@ -225,40 +296,28 @@ class MonitoringManager:
     def instrument_endpoint(self, method: str, endpoint: str):
         """Decorator for instrumenting API endpoints"""
         def decorator(func):
+            # Bind labeled children once so each request only updates them
+            labeled = self.collector.labeled
+            duration = labeled("request_duration_seconds", method, endpoint)
+            success_count = labeled("request_count", method, endpoint, "success")
+            error_count = labeled("request_count", method, endpoint, "error")
+            active_connections = self.collector.get_metric(
+                "active_connections"
+            )
+            
             @functools.wraps(func)
             async def wrapper(*args, **kwargs):
-                request_duration = self.collector.get_metric(
-                    "request_duration_seconds"
-                )
-                request_count = self.collector.get_metric("request_count")
-                active_connections = self.collector.get_metric(
-                    "active_connections"
-                )
-                
-                start_time = time.time()
+                start_time = time.perf_counter()
                 active_connections.inc()
                 
                 try:
                     result = await func(*args, **kwargs)
-                    request_duration.labels(
-                        method=method,
-                        endpoint=endpoint
-                    ).observe(time.time() - start_time)
-                    request_count.labels(
-                        method=method,
-                        endpoint=endpoint,
-                        status="success"
-                    ).inc()
+                    duration.observe(time.perf_counter() - start_time)
+                    success_count.inc()
                     return result
                 except Exception as e:
-                    request_count.labels(
-                        method=method,
-                        endpoint=endpoint,
-                        status="error"
-                    ).inc()
-                    self.collector.get_metric("error_count").labels(
-                        type=type(e).__name__
-                    ).inc()
+                    error_count.inc()
+                    labeled("error_count", type(e).__name__).inc()
                     raise
                 finally:
                     active_connections.dec()
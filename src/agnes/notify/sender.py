@@ -1,16 +1,21 @@
 from typing import Dict, Any, List, Optional, Union
 import asyncio
+import functools
+import hashlib
+import hmac
 import aiohttp
 import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-import json
-from datetime import datetime
+import orjson
+from datetime import datetime, timezone
+import re
+import time
 import logging
 from dataclasses import dataclass
 from enum import Enum
 import jinja2
-import markdown
+from markdown_it import MarkdownIt
 import aiofcm
 from twilio.rest import Client as TwilioClient
 import aioredis
@@ -19,6 +24,14 @@ import discord
 import slack_sdk.web.async_client as slack
 import boto3
 
+_markdown = MarkdownIt()
+_MARKDOWN_HINT = re.compile(r'[*_#`\[>]|^\s*([-+]|\d+\.)\s', re.M)
+
+@functools.lru_cache(maxsize=256)
+def _render_markdown(content: str) -> str:
+    """Render markdown content to HTML"""
+    return _markdown.render(content)
+
 class NotificationType(Enum):
     EMAIL = "email"
     SMS = "sms"
@@ -42,6 +55,7 @@ class Notification:
     recipient: str
     subject: str
     content: str
+    html_content: Optional[str] = None
     template: Optional[str] = None
     data: Optional[Dict[str, Any]] = None
     metadata: Dict[str, Any] = None
@@ -53,14 +67,37 @@ class NotificationSender:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.template_env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader('templates/notifications')
+            loader=jinja2.FileSystemLoader('templates/notifications'),
+            bytecode_cache=jinja2.FileSystemBytecodeCache(
+                config.get('template_cache_dir')
+            )
         )
+        self._templates: Dict[str, jinja2.Template] = {
+            name: self.template_env.get_template(name)
+            for name in self.template_env.list_templates()
+        }
+        self._render_cached = functools.lru_cache(
+            maxsize=config.get('template_render_cache_size', 256)
+        )(self._render)
         self.logger = logging.getLogger(__name__)
         self.cache = aioredis.Redis.from_url(config['cache']['redis_url'])
+        self._rate_limit_script = self.cache.register_script(
+            "local v = redis.call('INCR', KEYS[1]) "
+            "if v == 1 then redis.call('EXPIRE', KEYS[1], ARGV[1]) end "
+            "return v"
+        )
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._smtp_lock = asyncio.Lock()
+        self._smtp_keepalive: Optional[asyncio.Task] = None
         self._setup_clients()
     
     def _setup_clients(self):
         """Setup notification clients"""
+        # Shared HTTP pool for webhook and Discord sends
+        self._http = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300)
+        )
+        
         # Email
         if self.config['email']['enabled']:
             self.email_config = self.config['email']
@@ -91,6 +128,20 @@ class NotificationSender:
             self.telegram = telegram.Bot(
                 token=self.config['telegram']['bot_token']
             )
+        
+        # Webhook signing key
+        if 'webhook' in self.config:
+            self._webhook_key = self.config['webhook']['secret'].encode()
+        
+        self._dispatch = {
+            NotificationType.EMAIL: self._send_email,
+            NotificationType.SMS: self._send_sms,
+            NotificationType.PUSH: self._send_push,
+            NotificationType.SLACK: self._send_slack,
+            NotificationType.DISCORD: self._send_discord,
+            NotificationType.TELEGRAM: self._send_telegram,
+            NotificationType.WEBHOOK: self._send_webhook
+        }
     
     async def send(self, notification: Notification):
         """Send notification"""
@@ -105,25 +156,16 @@ class NotificationSender:
                     notification.template,
                     notification.data or {}
                 )
+                if notification.type == NotificationType.EMAIL:
+                    notification.html_content = _render_markdown(
+                        notification.content
+                    )
             
             # Send based on type
-            if notification.type == NotificationType.EMAIL:
-                await self._send_email(notification)
-            elif notification.type == NotificationType.SMS:
-                await self._send_sms(notification)
-            elif notification.type == NotificationType.PUSH:
-                await self._send_push(notification)
-            elif notification.type == NotificationType.SLACK:
-                await self._send_slack(notification)
-            elif notification.type == NotificationType.DISCORD:
-                await self._send_discord(notification)
-            elif notification.type == NotificationType.TELEGRAM:
-                await self._send_telegram(notification)
-            elif notification.type == NotificationType.WEBHOOK:
-                await self._send_webhook(notification)
+            await self._dispatch[notification.type](notification)
             
             notification.status = "sent"
-            notification.sent_at = datetime.utcnow()
+            notification.sent_at = datetime.now(timezone.utc)
             
             # Store in cache for deduplication
             await self._store_sent(notification)
@@ -136,33 +178,84 @@ class NotificationSender:
     
     async def _send_email(self, notification: Notification):
         """Send email notification"""
-        msg = MIMEMultipart('alternative')
+        html = notification.html_content
+        if html is None and _MARKDOWN_HINT.search(notification.content):
+            html = _render_markdown(notification.content)
+        
+        if html is None:
+            # Plain content needs no alternative part
+            msg = MIMEText(notification.content, 'plain')
+        else:
+            # Plain text and HTML versions
+            msg = MIMEMultipart('alternative')
+            msg.attach(MIMEText(notification.content, 'plain'))
+            msg.attach(MIMEText(html, 'html'))
+        
         msg['Subject'] = notification.subject
         msg['From'] = self.email_config['from_address']
         msg['To'] = notification.recipient
         
-        # Plain text and HTML versions
-        text_part = MIMEText(notification.content, 'plain')
-        html_part = MIMEText(
-            markdown.markdown(notification.content),
-            'html'
-        )
-        
-        msg.attach(text_part)
-        msg.attach(html_part)
+        async with self._smtp_lock:
+            smtp = await self._get_smtp()
+            try:
+                await smtp.send_message(msg)
+            except aiosmtplib.SMTPServerDisconnected:
+                # Server dropped the idle connection; reconnect once
+                self._smtp = None
+                smtp = await self._get_smtp()
+                await smtp.send_message(msg)
+    
+    async def _get_smtp(self) -> aiosmtplib.SMTP:
+        """Get connected SMTP client, connecting if needed"""
+        if self._smtp is not None and self._smtp.is_connected:
+            return self._smtp
         
-        async with aiosmtplib.SMTP(
+        smtp = aiosmtplib.SMTP(
             hostname=self.email_config['smtp_host'],
             port=self.email_config['smtp_port'],
             use_tls=self.email_config['use_tls']
-        ) as smtp:
-            if self.email_config['username']:
-                await smtp.login(
-                    self.email_config['username'],
-                    self.email_config['password']
-                )
-            
-            await smtp.send_message(msg)
+        )
+        await smtp.connect()
+        if self.email_config['username']:
+            await smtp.login(
+                self.email_config['username'],
+                self.email_config['password']
+            )
+        self._smtp = smtp
+        
+        if self._smtp_keepalive is None:
+            self._smtp_keepalive = asyncio.create_task(
+                self._keep_smtp_alive()
+            )
+        
+        return smtp
+    
+    async def _keep_smtp_alive(self):
+        """Keep pooled SMTP connection from idling out"""
+        while True:
+            await asyncio.sleep(self.email_config.get('keepalive_interval', 30))
+            async with self._smtp_lock:
+                if self._smtp is None or not self._smtp.is_connected:
+                    continue
+                try:
+                    await self._smtp.noop()
+                except aiosmtplib.SMTPException:
+                    self._smtp = None
+    
+    async def close(self):
+        """Close pooled connections"""
+        if self._smtp_keepalive is not None:
+            self._smtp_keepalive.cancel()
+            self._smtp_keepalive = None
+        
+        if self._smtp is not None and self._smtp.is_connected:
+            try:
+                await self._smtp.quit()
+            except aiosmtplib.SMTPException:
+                pass
+        self._smtp = None
+        
+        await self._http.close()
     
     async def _send_sms(self, notification: Notification):
         """Send SMS notification"""
@@ -205,7 +298,7 @@ class NotificationSender:
         """Send Discord notification"""
         webhook = discord.Webhook.from_url(
             notification.recipient,
-            adapter=discord.AsyncWebhookAdapter(aiohttp.ClientSession())
+            adapter=discord.AsyncWebhookAdapter(self._http)
         )
         
         embed = discord.Embed(
@@ -225,43 +318,60 @@ class NotificationSender:
     
     async def _send_webhook(self, notification: Notification):
         """Send webhook notification"""
-        async with aiohttp.ClientSession() as session:
-            await session.post(
-                notification.recipient,
-                json={
+        async with self._http.post(
+            notification.recipient,
+            data=orjson.dumps(
+                {
                     'id': notification.id,
                     'subject': notification.subject,
                     'content': notification.content,
                     'data': notification.data,
                     'metadata': notification.metadata
                 },
-                headers={
-                    'Content-Type': 'application/json',
-                    'X-Agnes-Signature': self._generate_signature(notification)
-                }
-            )
+                default=str
+            ),
+            headers={
+                'Content-Type': 'application/json',
+                'X-Agnes-Signature': self._generate_signature(notification)
+            }
+        ):
+            pass
     
     async def _render_template(self,
                              template_name: str,
                              data: Dict[str, Any]) -> str:
         """Render notification template"""
-        template = self.template_env.get_template(template_name)
-        return template.render(**data)
+        try:
+            key = tuple(sorted(data.items()))
+            hash(key)
+        except TypeError:
+            return self._render(template_name, tuple(data.items()))
+        
+        return self._render_cached(template_name, key)
+    
+    def _render(self, template_name: str, items: tuple) -> str:
+        """Render preloaded template with data items"""
+        template = self._templates.get(template_name)
+        if template is None:
+            template = self._templates[template_name] = \
+                self.template_env.get_template(template_name)
+        return template.render(**dict(items))
     
     async def _check_rate_limit(self,
                               notification: Notification) -> bool:
         """Check notification rate limit"""
         key = f"ratelimit:{notification.type.value}:{notification.recipient}"
-        count = await self.cache.incr(key)
         
-        if count == 1:
-            await self.cache.expire(
-                key,
+        # INCR and first-hit EXPIRE in one round trip
+        count = await self._rate_limit_script(
+            keys=[key],
+            args=[
                 self.config['rate_limits'].get(
                     notification.type.value,
                     3600
                 )
-            )
+            ]
+        )
         
         max_count = self.config['rate_limits'].get(
             f"{notification.type.value}_count",
@@ -275,12 +385,12 @@ class NotificationSender:
         key = f"sent:{notification.id}"
         await self.cache.set(
             key,
-            json.dumps({
+            orjson.dumps({
                 'id': notification.id,
                 'type': notification.type.value,
                 'recipient': notification.recipient,
                 'subject': notification.subject,
-                'sent_at': notification.sent_at.isoformat()
+                'sent_at': notification.sent_at
             }),
             ex=self.config['dedup_ttl']
         )
@@ -288,17 +398,12 @@ class NotificationSender:
     def _generate_signature(self,
                           notification: Notification) -> str:
         """Generate webhook signature"""
-        import hmac
-        import hashlib
-        
         message = f"{notification.id}:{notification.recipient}"
-        signature = hmac.new(
-            self.config['webhook']['secret'].encode(),
+        return hmac.new(
+            self._webhook_key,
             message.encode(),
             hashlib.sha256
         ).hexdigest()
-        
-        return signature
 
 class NotificationBatcher:
     def __init__(self,
@@ -306,44 +411,78 @@ class NotificationBatcher:
                  config: Dict[str, Any]):
         self.sender = sender
         self.config = config
-        self.batches: Dict[str, List[Notification]] = {}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
         self.logger = logging.getLogger(__name__)
     
     async def add(self, notification: Notification):
         """Add notification to batch"""
         key = f"{notification.type.value}:{notification.recipient}"
         
-        if key not in self.batches:
-            self.batches[key] = []
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.Queue()
+            self._workers[key] = asyncio.create_task(self._worker(key, queue))
         
-        self.batches[key].append(notification)
+        # No await between lookup and put, so an exiting worker cannot
+        # drop the queue in between
+        queue.put_nowait(notification)
+    
+    async def _worker(self, key: str, queue: asyncio.Queue):
+        """Drain one destination, flushing on batch size or age"""
+        loop = asyncio.get_running_loop()
+        batch_size = self.config['batch_size']
+        max_age = self.config.get('max_batch_age', 1.0)
+        idle_timeout = self.config.get('worker_idle_timeout', 60)
         
-        # Send batch if threshold reached
-        if len(self.batches[key]) >= self.config['batch_size']:
-            await self._send_batch(key)
+        while True:
+            try:
+                notifications = [
+                    await asyncio.wait_for(queue.get(), idle_timeout)
+                ]
+            except asyncio.TimeoutError:
+                # Retire idle destinations; add() starts a fresh worker
+                if queue.empty():
+                    self._queues.pop(key, None)
+                    self._workers.pop(key, None)
+                    return
+                continue
+            
+            deadline = loop.time() + max_age
+            
+            while len(notifications) < batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    notifications.append(
+                        await asyncio.wait_for(queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+            
+            await self._send_batch(notifications)
     
-    async def _send_batch(self, key: str):
+    async def _send_batch(self, notifications: List[Notification]):
         """Send notification batch"""
-        if key not in self.batches:
-            return
-        
-        notifications = self.batches[key]
-        if not notifications:
-            return
-        
         try:
             # Combine notifications
             combined = self._combine_notifications(notifications)
             
             # Send combined notification
             await self.sender.send(combined)
-            
-            # Clear batch
-            self.batches[key] = []
         
         except Exception as e:
             self.logger.error(f"Failed to send notification batch: {e}")
     
+    async def close(self):
+        """Stop batch workers"""
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+        self._queues.clear()
+    
     def _combine_notifications(self,
                              notifications: List[Notification]) -> Notification:
         """Combine multiple notifications"""
@@ -356,7 +495,7 @@ class NotificationBatcher:
             content = "\n\n".join(n.content for n in notifications)
         
         return Notification(
-            id=f"batch-{datetime.utcnow().timestamp()}",
+            id=f"batch-{time.time_ns()}",
             type=first.type,
             priority=max(n.priority for n in notifications),
             recipient=first.recipient,
@@ -3,114 +3,226 @@ import cProfile
 import pstats
 import time
 import asyncio
+import sys
 import tracemalloc
+import traceback
 from functools import wraps
-from dataclasses import dataclass
+from collections import deque
 import numpy as np
-
-@dataclass
-class ProfileResult:
-    function_name: str
-    execution_time: float
-    memory_usage: int
-    cpu_usage: float
-    call_count: int
+import psutil
 
 class PerformanceProfiler:
-    def __init__(self):
+    def __init__(self, sample_interval: float = 0.05, sample_size: int = 1200):
         self.profiler = cProfile.Profile()
-        self.results: Dict[str, List[ProfileResult]] = {}
-        tracemalloc.start()
+        # Per-function column buffers: exec/mem/cpu arrays plus fill count
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.sample_interval = sample_interval
+        self.samples: deque = deque(maxlen=sample_size)
+        self._sampler: Optional[asyncio.Task] = None
+        
+        # Deep calls share one cProfile and tracemalloc, so they run one
+        # at a time and tracing is refcounted per session
+        self._deep_lock: Optional[asyncio.Lock] = None
+        self._trace_sessions = 0
+        self._owns_tracing = False
+        
+        # One persistent handle; cpu_percent(None) reports the delta since
+        # the previous read, so prime it here
+        self._proc = psutil.Process()
+        self._proc.cpu_percent(interval=None)
     
-    async def profile_function(self, func):
+    async def profile_function(self, func, deep: bool = False):
         """Decorator for profiling async functions"""
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            # Start profiling
-            start_time = time.time()
-            memory_start = tracemalloc.get_traced_memory()[0]
-            
-            # Execute function
-            self.profiler.enable()
-            result = await func(*args, **kwargs)
-            self.profiler.disable()
+            self._ensure_sampler()
             
-            # Collect metrics
-            end_time = time.time()
-            memory_end = tracemalloc.get_traced_memory()[0]
+            # Full instrumentation only when explicitly requested
+            if deep:
+                if self._deep_lock is None:
+                    self._deep_lock = asyncio.Lock()
+                async with self._deep_lock:
+                    return await self._run_deep(func, args, kwargs)
             
-            # Create profile result
-            profile_result = ProfileResult(
-                function_name=func.__name__,
-                execution_time=end_time - start_time,
-                memory_usage=memory_end - memory_start,
-                cpu_usage=self._get_cpu_usage(),
-                call_count=1
+            memory_start = (
+                tracemalloc.get_traced_memory()[0]
+                if tracemalloc.is_tracing() else 0
             )
+            start_time = time.perf_counter()
+            result = await func(*args, **kwargs)
+            execution_time = time.perf_counter() - start_time
+            
+            memory_usage = 0
+            if tracemalloc.is_tracing():
+                memory_usage = tracemalloc.get_traced_memory()[0] - memory_start
             
             # Store result
-            if func.__name__ not in self.results:
-                self.results[func.__name__] = []
-            self.results[func.__name__].append(profile_result)
+            self._append_result(
+                func.__name__,
+                execution_time,
+                memory_usage,
+                self._get_cpu_usage()
+            )
             
             return result
         
         return wrapper
     
+    async def _run_deep(self, func, args: tuple, kwargs: Dict[str, Any]):
+        """Run function under cProfile and tracemalloc"""
+        self._start_tracing()
+        memory_start = tracemalloc.get_traced_memory()[0]
+        start_time = time.perf_counter()
+        self.profiler.enable()
+        try:
+            result = await func(*args, **kwargs)
+        finally:
+            self.profiler.disable()
+            execution_time = time.perf_counter() - start_time
+            memory_usage = tracemalloc.get_traced_memory()[0] - memory_start
+            self._stop_tracing()
+        
+        self._append_result(
+            func.__name__,
+            execution_time,
+            memory_usage,
+            self._get_cpu_usage()
+        )
+        return result
+    
+    def _start_tracing(self):
+        """Start tracemalloc on the first deep session"""
+        if self._trace_sessions == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+        self._trace_sessions += 1
+    
+    def _stop_tracing(self):
+        """Stop tracemalloc when the last deep session ends"""
+        self._trace_sessions -= 1
+        if self._trace_sessions == 0 and self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+    
+    def _ensure_sampler(self):
+        """Start background resource sampler if not running"""
+        if self._sampler is None or self._sampler.done():
+            self._sampler = asyncio.create_task(self._sample_loop())
+    
+    async def _sample_loop(self):
+        """Sample process CPU and RSS at a fixed cadence"""
+        process = self._proc
+        
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            with process.oneshot():
+                self.samples.append((
+                    time.time(),
+                    process.cpu_percent(interval=None),
+                    process.memory_info().rss
+                ))
+    
+    async def stop(self):
+        """Stop background resource sampler"""
+        if self._sampler is not None:
+            self._sampler.cancel()
+            try:
+                await self._sampler
+            except asyncio.CancelledError:
+                pass
+            self._sampler = None
+    
     def _get_cpu_usage(self) -> float:
-        """Get CPU usage for the current process"""
-        import psutil
-        process = psutil.Process()
-        return process.cpu_percent()
+        """Get latest sampled CPU usage for the current process"""
+        if not self.samples:
+            return self._proc.cpu_percent(interval=None)
+        return self.samples[-1][1]
+    
+    def _append_result(self,
+                       function_name: str,
+                       execution_time: float,
+                       memory_usage: int,
+                       cpu_usage: float):
+        """Append result to function buffers, doubling when full"""
+        buf = self.results.get(function_name)
+        if buf is None:
+            cap = 64
+            buf = self.results[function_name] = {
+                "exec": np.empty(cap),
+                "mem": np.empty(cap, dtype=np.int64),
+                "cpu": np.empty(cap),
+                "n": 0,
+                "cap": cap
+            }
+        elif buf["n"] == buf["cap"]:
+            buf["cap"] *= 2
+            for column in ("exec", "mem", "cpu"):
+                grown = np.empty(buf["cap"], dtype=buf[column].dtype)
+                grown[:buf["n"]] = buf[column]
+                buf[column] = grown
+        
+        n = buf["n"]
+        buf["exec"][n] = execution_time
+        buf["mem"][n] = memory_usage
+        buf["cpu"][n] = cpu_usage
+        buf["n"] = n + 1
     
     def get_stats(self, function_name: Optional[str] = None) -> Dict[str, Any]:
         """Get profiling statistics"""
         if function_name and function_name in self.results:
-            results = self.results[function_name]
+            buffers = [self.results[function_name]]
         else:
-            results = [r for results in self.results.values() for r in results]
+            buffers = list(self.results.values())
         
-        if not results:
+        n = sum(buf["n"] for buf in buffers)
+        if not n:
             return {}
         
-        # Calculate statistics
-        exec_times = [r.execution_time for r in results]
-        memory_usage = [r.memory_usage for r in results]
-        cpu_usage = [r.cpu_usage for r in results]
+        # Calculate statistics over the filled slices
+        exec_times, memory_usage, cpu_usage = (
+            np.concatenate([buf[column][:buf["n"]] for buf in buffers])
+            for column in ("exec", "mem", "cpu")
+        )
         
         return {
-            "execution_time": {
-                "mean": np.mean(exec_times),
-                "std": np.std(exec_times),
-                "min": np.min(exec_times),
-                "max": np.max(exec_times),
-            },
-            "memory_usage": {
-                "mean": np.mean(memory_usage),
-                "std": np.std(memory_usage),
-                "min": np.min(memory_usage),
-                "max": np.max(memory_usage),
-            },
-            "cpu_usage": {
-                "mean": np.mean(cpu_usage),
-                "std": np.std(cpu_usage),
-                "min": np.min(cpu_usage),
-                "max": np.max(cpu_usage),
-            },
-            "call_count": len(results)
+            "execution_time": self._summarize(exec_times),
+            "memory_usage": self._summarize(memory_usage),
+            "cpu_usage": self._summarize(cpu_usage),
+            "call_count": n
+        }
+    
+    def _summarize(self, values: np.ndarray) -> Dict[str, float]:
+        """Summarize array of samples"""
+        return {
+            "mean": values.mean(),
+            "std": values.std(),
+            "min": values.min(),
+            "max": values.max(),
         }
 
 class BottleneckDetector:
-    def __init__(self, threshold_ms: float = 100):
+    def __init__(self,
+                 threshold_ms: float = 100,
+                 capture_memory: bool = False,
+                 max_records: int = 1000,
+                 stack_depth: int = 10):
         self.threshold_ms = threshold_ms
-        self.slow_operations: List[Dict[str, Any]] = []
+        self.threshold_ns = int(threshold_ms * 1_000_000)
+        self.capture_memory = capture_memory
+        self.stack_depth = stack_depth
+        self.slow_operations: deque = deque(maxlen=max_records)
     
     async def monitor(self, func):
         """Decorator for monitoring function performance"""
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            start_time = time.time()
-            start_memory = tracemalloc.get_traced_memory()[0]
+            # Keep only the caller frame; the stack is walked if slow
+            caller = sys._getframe(1)
+            capture_memory = self.capture_memory and tracemalloc.is_tracing()
+            start_memory = (
+                tracemalloc.get_traced_memory()[0] if capture_memory else 0
+            )
+            start_time = time.perf_counter_ns()
             
             try:
                 result = await func(*args, **kwargs)
@@ -118,14 +230,18 @@ class BottleneckDetector:
                 self._record_error(func.__name__, e)
                 raise
             
-            execution_time = (time.time() - start_time) * 1000  # Convert to ms
-            memory_delta = tracemalloc.get_traced_memory()[0] - start_memory
+            elapsed_ns = time.perf_counter_ns() - start_time
             
-            if execution_time > self.threshold_ms:
+            if elapsed_ns > self.threshold_ns:
+                memory_delta = (
+                    tracemalloc.get_traced_memory()[0] - start_memory
+                    if capture_memory else 0
+                )
                 self._record_slow_operation(
                     func.__name__,
-                    execution_time,
-                    memory_delta
+                    elapsed_ns / 1_000_000,
+                    memory_delta,
+                    self._compact_stack(caller)
                 )
             
             return result
@@ -135,16 +251,29 @@ class BottleneckDetector:
     def _record_slow_operation(self, 
                              func_name: str, 
                              execution_time: float, 
-                             memory_delta: int):
+                             memory_delta: int,
+                             stack: tuple):
         """Record slow operation details"""
         self.slow_operations.append({
             "function": func_name,
             "execution_time_ms": execution_time,
             "memory_delta": memory_delta,
             "timestamp": time.time(),
-            "stack_trace": traceback.extract_stack()
+            "stack": stack
         })
     
+    def _compact_stack(self, frame) -> tuple:
+        """Compact stack as (filename, lineno, name) tuples"""
+        stack = []
+        while frame is not None and len(stack) < self.stack_depth:
+            stack.append((
+                frame.f_code.co_filename,
+                frame.f_lineno,
+                frame.f_code.co_name
+            ))
+            frame = frame.f_back
+        return tuple(stack)
+    
     def _record_error(self, func_name: str, error: Exception):
         """Record error details"""
         self.slow_operations.append({
@@ -157,6 +286,17 @@ class BottleneckDetector:
     
     def get_bottlenecks(self) -> List[Dict[str, Any]]:
         """Get list of detected bottlenecks"""
+        for operation in self.slow_operations:
+            if "stack_trace" not in operation:
+                # Innermost frame last, matching extract_stack()
+                operation["stack_trace"] = traceback.StackSummary.from_list(
+                    [
+                        (filename, lineno, name, None)
+                        for filename, lineno, name in
+                        reversed(operation["stack"])
+                    ]
+                )
+        
         return sorted(
             self.slow_operations,
             key=lambda x: x.get("execution_time_ms", 0),
@@ -167,6 +307,12 @@ class ResourceOptimizer:
     def __init__(self):
         self.memory_threshold = 0.8  # 80% memory usage threshold
         self.cpu_threshold = 0.8     # 80% CPU usage threshold
+        self._caches: List[Any] = []
+    
+    def register_cache(self, func):
+        """Register lru_cache-wrapped function to clear under pressure"""
+        self._caches.append(func)
+        return func
     
     async def optimize_resources(self):
         """Optimize system resources"""
@@ -192,14 +338,9 @@ class ResourceOptimizer:
         # Force garbage collection
         gc.collect()
         
-        # Clear internal caches
-        import sys
-        sys.intern.clear()
-        
-        # Clear function cache if exists
-        for func in gc.get_objects():
-            if hasattr(func, "cache_clear"):
-                func.cache_clear()
+        # Clear registered function caches
+        for func in self._caches:
+            func.cache_clear()
     
     async def _optimize_cpu(self):
         """Optimize CPU usage"""
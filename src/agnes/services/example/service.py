@@ -1,4 +1,5 @@
 from agnes.microservice.service import Microservice, ServiceConfig
+from agnes.utils.event_loop import install_event_loop_policy
 from aiohttp import web
 import logging
 import json
@@ -49,5 +50,6 @@ async def create_service():
     return service
 
 if __name__ == "__main__":
-    # Run service
+    # Run service, on uvloop when available
+    install_event_loop_policy()
     asyncio.run(create_service())
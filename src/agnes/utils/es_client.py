@@ -0,0 +1,24 @@
+from typing import Dict, Any, List
+from elasticsearch import AsyncElasticsearch
+
+# url -> [client, refcount]
+_clients: Dict[str, List[Any]] = {}
+
+def get_es_client(url: str) -> AsyncElasticsearch:
+    """Get shared Elasticsearch client for URL"""
+    entry = _clients.get(url)
+    if entry is None:
+        entry = _clients[url] = [AsyncElasticsearch([url]), 0]
+    entry[1] += 1
+    return entry[0]
+
+async def release_es_client(url: str):
+    """Release shared client, closing it with its last user"""
+    entry = _clients.get(url)
+    if entry is None:
+        return
+    
+    entry[1] -= 1
+    if entry[1] <= 0:
+        del _clients[url]
+        await entry[0].close()
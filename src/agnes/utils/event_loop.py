@@ -0,0 +1,15 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+def install_event_loop_policy() -> bool:
+    """Run asyncio on uvloop when it is installed"""
+    try:
+        import uvloop
+    except ImportError:
+        logger.debug("uvloop not installed, using default event loop")
+        return False
+    
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
@@ -0,0 +1,45 @@
+import pytest
+from agnes.monitor.collector import MetricsCollector
+
+@pytest.fixture(scope="module")
+def collector():
+    # Metrics register globally, so share one collector across tests
+    return MetricsCollector({'storage': {'type': 'none'}})
+
+@pytest.fixture
+def stored(collector):
+    stored = []
+    
+    async def record(metrics):
+        stored.extend(metrics)
+    
+    collector.storage.store_metrics = record
+    collector._dirty.clear()
+    return stored
+
+async def test_external_counter_update_is_stored(collector, stored):
+    collector.metrics['http_requests_total'].labels(
+        method='GET',
+        endpoint='/health',
+        status='200'
+    ).inc()
+    
+    await collector._store_metrics()
+    
+    samples = [m for m in stored if m.name == 'http_requests']
+    assert len(samples) == 1
+    assert samples[0].labels == {
+        'method': 'GET',
+        'endpoint': '/health',
+        'status': '200'
+    }
+    assert samples[0].value == 1
+
+async def test_unchanged_metrics_are_not_stored_again(collector, stored):
+    collector.metrics['active_users'].set(5)
+    await collector._store_metrics()
+    assert [m.name for m in stored] == ['active_users']
+    
+    stored.clear()
+    await collector._store_metrics()
+    assert stored == []
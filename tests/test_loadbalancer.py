@@ -0,0 +1,179 @@
+import pytest
+import asyncio
+import logging
+from types import SimpleNamespace
+from multidict import CIMultiDict
+from agnes.loadbalancer.balancer import (
+    LoadBalancer,
+    LoadBalancerProxy,
+    ServerConfig,
+    ServerStatus,
+    _end_to_end_headers
+)
+
+def make_balancer(strategy: str) -> LoadBalancer:
+    balancer = LoadBalancer({
+        'strategy': strategy,
+        'servers': []
+    })
+    for i, weight in enumerate((1, 2, 3)):
+        balancer.servers.append(ServerStatus(
+            server=ServerConfig(host=f"10.0.0.{i}", port=8000, weight=weight)
+        ))
+    balancer._rebuild_active_servers()
+    balancer._rebuild_hash_ring()
+    return balancer
+
+@pytest.fixture
+async def weighted_balancer():
+    balancer = make_balancer('weighted_round_robin')
+    yield balancer
+    await balancer.cleanup()
+
+@pytest.fixture
+async def hash_balancer():
+    balancer = make_balancer('ip_hash')
+    yield balancer
+    await balancer.cleanup()
+
+@pytest.fixture
+async def least_conn_balancer():
+    balancer = make_balancer('least_connections')
+    yield balancer
+    await balancer.cleanup()
+
+async def test_weighted_round_robin_follows_weights(weighted_balancer):
+    picks = [
+        await weighted_balancer.get_next_server()
+        for _ in range(60)
+    ]
+    
+    counts = [picks.count(server) for server in weighted_balancer.servers]
+    assert counts == [10, 20, 30]
+
+async def test_weighted_round_robin_skips_inactive(weighted_balancer):
+    inactive = weighted_balancer.servers[2]
+    weighted_balancer._set_active(inactive, False)
+    
+    picks = [
+        await weighted_balancer.get_next_server()
+        for _ in range(30)
+    ]
+    assert inactive not in picks
+
+async def test_try_alloc_stays_in_given_pool(weighted_balancer, hash_balancer):
+    for balancer in (weighted_balancer, hash_balancer):
+        pool = balancer.servers[:2]
+        for i in range(50):
+            server = balancer.try_alloc(pool, f"192.168.1.{i}")
+            assert any(server is s for s in pool)
+
+async def test_ip_hash_is_sticky(hash_balancer):
+    first = await hash_balancer.get_next_server("192.168.1.10")
+    for _ in range(10):
+        assert await hash_balancer.get_next_server("192.168.1.10") is first
+
+async def test_ip_hash_moves_only_keys_of_removed_server(hash_balancer):
+    clients = [f"192.168.1.{i}" for i in range(200)]
+    before = {
+        ip: await hash_balancer.get_next_server(ip)
+        for ip in clients
+    }
+    
+    removed = hash_balancer.servers[0]
+    hash_balancer._set_active(removed, False)
+    
+    for ip in clients:
+        server = await hash_balancer.get_next_server(ip)
+        assert server is not removed
+        if before[ip] is not removed:
+            assert server is before[ip]
+
+async def test_least_connections_prefers_lower_ema(least_conn_balancer):
+    busy, idle = least_conn_balancer.servers[0], least_conn_balancer.servers[1]
+    busy.ema = 50.0
+    idle.ema = 1.0
+    pool = [busy, idle]
+    
+    for _ in range(20):
+        assert least_conn_balancer.try_alloc(pool) is idle
+
+async def test_least_connections_hysteresis(least_conn_balancer):
+    current, other = least_conn_balancer.servers[0], least_conn_balancer.servers[1]
+    pool = [current, other]
+    current.ema = 10.0
+    other.ema = 20.0
+    assert least_conn_balancer.try_alloc(pool) is current
+    
+    # Slightly less loaded is not enough to switch
+    other.ema = 9.5
+    assert least_conn_balancer.try_alloc(pool) is current
+    
+    # Clearly less loaded is
+    other.ema = 5.0
+    assert least_conn_balancer.try_alloc(pool) is other
+
+async def test_health_check_loop_survives_empty_server_list():
+    balancer = LoadBalancer({
+        'servers': [],
+        'health_check_interval': 0.01
+    })
+    task = asyncio.create_task(balancer._health_check_loop())
+    try:
+        await asyncio.sleep(0.05)
+        assert not task.done()
+    finally:
+        task.cancel()
+        await balancer.cleanup()
+
+async def test_health_check_error_counts_as_failure(weighted_balancer, caplog):
+    async def broken_check(server):
+        raise RuntimeError("boom")
+    
+    weighted_balancer._check_server_health = broken_check
+    weighted_balancer.config['health_check_interval'] = 60
+    
+    with caplog.at_level(logging.WARNING):
+        task = asyncio.create_task(weighted_balancer._health_check_loop())
+        await asyncio.sleep(0.05)
+        task.cancel()
+    
+    assert [s.failed_checks for s in weighted_balancer.servers] == [1, 1, 1]
+    assert "RuntimeError('boom')" in caplog.text
+    assert "timed out" not in caplog.text
+
+def test_end_to_end_headers_strips_hop_by_hop():
+    headers = CIMultiDict([
+        ('Host', 'example.com'),
+        ('Connection', 'keep-alive, X-Session-Hop'),
+        ('Keep-Alive', 'timeout=5'),
+        ('Transfer-Encoding', 'chunked'),
+        ('Upgrade', 'websocket'),
+        ('X-Session-Hop', '1'),
+        ('Accept', 'application/json'),
+        ('Accept', 'text/plain')
+    ])
+    
+    forwarded = _end_to_end_headers(headers)
+    assert list(forwarded.items()) == [
+        ('Host', 'example.com'),
+        ('Accept', 'application/json'),
+        ('Accept', 'text/plain')
+    ]
+
+async def test_forward_connection_error_marks_server_inactive(weighted_balancer):
+    proxy = LoadBalancerProxy(weighted_balancer)
+    server = ServerStatus(server=ServerConfig(host="127.0.0.1", port=1))
+    request = SimpleNamespace(
+        method="GET",
+        path_qs="/",
+        headers=CIMultiDict(),
+        content=b""
+    )
+    
+    try:
+        with pytest.raises(Exception, match="Forward request failed"):
+            await proxy._forward_request(server, request)
+        assert not server.active
+    finally:
+        await proxy.cleanup()
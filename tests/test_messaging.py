@@ -0,0 +1,67 @@
+import pytest
+import asyncio
+from agnes.messaging.queue import MessageQueue
+
+class RecordingExchange:
+    def __init__(self, fail_keys=()):
+        self.sent = []
+        self.fail_keys = set(fail_keys)
+    
+    async def publish(self, message, routing_key: str):
+        if routing_key in self.fail_keys:
+            raise ConnectionError(f"publish to {routing_key} failed")
+        self.sent.append((message, routing_key))
+
+def record_batches(queue: MessageQueue) -> list:
+    sizes = []
+    send_batch = queue._send_batch
+    
+    async def recording_send(batch):
+        sizes.append(len(batch))
+        await send_batch(batch)
+    
+    queue._send_batch = recording_send
+    return sizes
+
+@pytest.fixture
+def queue():
+    return MessageQueue({'publish_batch_size': 100})
+
+async def test_publishes_in_one_tick_share_a_batch(queue):
+    exchange = RecordingExchange()
+    sizes = record_batches(queue)
+    
+    await asyncio.gather(*(
+        queue._enqueue_publish(exchange, f"m{i}", "orders")
+        for i in range(3)
+    ))
+    
+    assert sizes == [3]
+    assert [message for message, _ in exchange.sent] == ["m0", "m1", "m2"]
+    assert queue._publish_tasks == set()
+
+async def test_failed_publish_fails_only_its_caller(queue):
+    exchange = RecordingExchange(fail_keys=["payments"])
+    
+    results = await asyncio.gather(
+        queue._enqueue_publish(exchange, "m0", "orders"),
+        queue._enqueue_publish(exchange, "m1", "payments"),
+        queue._enqueue_publish(exchange, "m2", "orders"),
+        return_exceptions=True
+    )
+    
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], ConnectionError)
+    assert [message for message, _ in exchange.sent] == ["m0", "m2"]
+
+async def test_full_batch_flushes_immediately():
+    queue = MessageQueue({'publish_batch_size': 2})
+    exchange = RecordingExchange()
+    sizes = record_batches(queue)
+    
+    await asyncio.gather(*(
+        queue._enqueue_publish(exchange, f"m{i}", "orders")
+        for i in range(3)
+    ))
+    
+    assert sizes == [2, 1]
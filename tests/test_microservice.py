@@ -0,0 +1,164 @@
+import pytest
+import asyncio
+import logging
+from types import SimpleNamespace
+from agnes.microservice.service import Breaker, Microservice, ServiceDiscovery
+
+class RecordingNats:
+    def __init__(self, flush_error=None):
+        self.published = []
+        self.flushes = 0
+        self.flush_error = flush_error
+    
+    async def publish(self, subject: str, payload: bytes):
+        self.published.append(subject)
+    
+    async def flush(self):
+        if self.flush_error is not None:
+            raise self.flush_error
+        self.flushes += 1
+
+def make_publisher(nats_client) -> Microservice:
+    # Only the event publish path is exercised, so skip component setup
+    service = Microservice.__new__(Microservice)
+    service.config = SimpleNamespace(name="orders")
+    service.logger = logging.getLogger("orders")
+    service.nats = nats_client
+    service.rmq = None
+    service._pub_queue = asyncio.Queue()
+    service._pub_inflight = None
+    return service
+
+@pytest.fixture
+async def publisher():
+    service = make_publisher(RecordingNats())
+    task = asyncio.create_task(service._publish_loop())
+    yield service
+    task.cancel()
+
+class FakeConsul:
+    def __init__(self, instances):
+        self.health = self
+        self.instances = instances
+        self.indexes = []
+        self.updates = asyncio.Queue()
+    
+    async def service(self, name: str, index=None, wait=None, passing=False):
+        self.indexes.append(index)
+        if index is None:
+            return 1, self.instances
+        
+        # Blocking query returns once the watched service changes
+        return await self.updates.get()
+
+def consul_entry(host: str) -> dict:
+    return {'Service': {'Address': host, 'Port': 8000}}
+
+@pytest.fixture
+async def discovery():
+    discovery = ServiceDiscovery({'consul': {'host': 'localhost', 'port': 8500}})
+    discovery.consul = FakeConsul([
+        consul_entry("10.0.0.1"),
+        consul_entry("10.0.0.2")
+    ])
+    yield discovery
+    await discovery.close()
+
+@pytest.fixture
+def breaker():
+    breaker = Breaker(threshold=2, reset=0.0)
+    breaker.on_failure()
+    breaker.on_failure()
+    return breaker
+
+def test_breaker_opens_at_threshold():
+    breaker = Breaker(threshold=2, reset=30.0)
+    breaker.on_failure()
+    assert not breaker.is_open()
+    
+    breaker.on_failure()
+    assert breaker.state == "open"
+    assert breaker.is_open()
+
+def test_half_open_admits_single_trial(breaker):
+    assert not breaker.is_open()
+    assert breaker.state == "half_open"
+    
+    # Concurrent callers fail fast while the trial is in flight
+    assert breaker.is_open()
+    assert breaker.is_open()
+
+def test_half_open_trial_success_closes(breaker):
+    assert not breaker.is_open()
+    breaker.on_success()
+    
+    assert breaker.state == "closed"
+    assert not breaker.is_open()
+    assert not breaker.is_open()
+
+def test_half_open_trial_failure_reopens(breaker):
+    assert not breaker.is_open()
+    breaker.on_failure()
+    
+    assert breaker.state == "open"
+    
+    # Reset period of zero lets the next trial through
+    assert not breaker.is_open()
+    assert breaker.is_open()
+
+def test_cancelled_trial_releases_slot(breaker):
+    assert not breaker.is_open()
+    breaker.on_cancel()
+    
+    assert breaker.state == "half_open"
+    assert not breaker.is_open()
+
+async def test_publish_event_requires_started_publisher():
+    service = make_publisher(RecordingNats())
+    service._pub_queue = None
+    
+    with pytest.raises(RuntimeError):
+        await service.publish_event("created", {"id": 1})
+
+async def test_published_events_share_one_flush(publisher):
+    await asyncio.gather(*(
+        publisher.publish_event("created", {"id": i})
+        for i in range(3)
+    ))
+    
+    assert publisher.nats.published == ["orders.created"] * 3
+    assert publisher.nats.flushes == 1
+
+async def test_publish_error_reaches_caller(publisher):
+    publisher.nats.flush_error = ConnectionError("nats down")
+    
+    with pytest.raises(ConnectionError):
+        await publisher.publish_event("created", {"id": 1})
+
+async def test_lookups_are_served_from_cache(discovery):
+    for _ in range(5):
+        assert await discovery.get_service("billing") is not None
+    await asyncio.sleep(0.01)
+    
+    # One plain lookup, then only the watcher's blocking query
+    assert discovery.consul.indexes == [None, 1]
+
+async def test_watch_refreshes_cached_instances(discovery):
+    await discovery.get_service("billing")
+    discovery.consul.updates.put_nowait((2, [consul_entry("10.0.0.3")]))
+    await asyncio.sleep(0.01)
+    
+    instance = await discovery.get_service("billing")
+    assert instance == {'host': "10.0.0.3", 'port': 8000}
+    assert discovery.consul.indexes == [None, 1, 2]
+
+async def test_get_service_cycles_instances(discovery):
+    hosts = [
+        (await discovery.get_service("billing"))['host']
+        for _ in range(4)
+    ]
+    assert hosts == ["10.0.0.1", "10.0.0.2", "10.0.0.1", "10.0.0.2"]
+
+async def test_get_service_without_instances_returns_none(discovery):
+    discovery.consul.instances = []
+    assert await discovery.get_service("billing") is None
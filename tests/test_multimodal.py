@@ -47,3 +47,60 @@ async def test_modality_encoding(pipeline):
     assert results["modality_features"]["text"].shape == (1, 256)
     assert results["modality_features"]["image"].shape == (1, 256)
     assert results["fused_output"].shape == (1, 256)
+
+
+@pytest.fixture
+def fusion():
+    torch.manual_seed(0)
+    return MultiModalFusion({"text": 256, "image": 128}, 256)
+
+def test_fusion_ignores_missing_modality(fusion):
+    text = torch.randn(2, 256)
+    with torch.no_grad():
+        before = fusion({"text": text})
+        
+        # Weights of an absent modality must not leak into the output
+        fusion.proj_weight[fusion.modality_index["image"]].normal_()
+        fusion.proj_bias[fusion.modality_index["image"]].normal_()
+        after = fusion({"text": text})
+    
+    assert torch.allclose(before, after, atol=1e-6)
+
+def test_fusion_requires_known_modality(fusion):
+    with pytest.raises(ValueError):
+        fusion({"audio": torch.randn(1, 64)})
+
+def test_fusion_loads_unpacked_checkpoint(fusion):
+    torch.manual_seed(1)
+    projections = {
+        "text": torch.nn.Linear(256, 256),
+        "image": torch.nn.Linear(128, 256)
+    }
+    attention = torch.nn.MultiheadAttention(embed_dim=256, num_heads=8)
+    
+    # Checkpoint in the layout saved before projections were packed
+    state_dict = {
+        key: value
+        for key, value in fusion.state_dict().items()
+        if key.startswith("fusion_layer.")
+    }
+    for modality, linear in projections.items():
+        state_dict[f"projections.{modality}.weight"] = linear.weight.detach()
+        state_dict[f"projections.{modality}.bias"] = linear.bias.detach()
+    for key, value in attention.state_dict().items():
+        state_dict[f"attention.{key}"] = value
+    
+    fusion.load_state_dict(state_dict)
+    
+    features = {
+        "text": torch.randn(3, 256),
+        "image": torch.randn(3, 128)
+    }
+    with torch.no_grad():
+        stacked = torch.stack([
+            projections[modality](x) for modality, x in features.items()
+        ])
+        attended, _ = attention(stacked, stacked, stacked)
+        expected = fusion.fusion_layer(attended.mean(dim=0))
+        
+        assert torch.allclose(fusion(features), expected, atol=1e-5)
@@ -0,0 +1,56 @@
+import pytest
+import asyncio
+from agnes.notify.sender import (
+    NotificationBatcher,
+    Notification,
+    NotificationType,
+    NotificationPriority
+)
+
+class RecordingSender:
+    def __init__(self):
+        self.sent = []
+    
+    async def send(self, notification: Notification):
+        self.sent.append(notification)
+
+def make_notification(i: int) -> Notification:
+    return Notification(
+        id=f"n{i}",
+        type=NotificationType.SMS,
+        priority=NotificationPriority.NORMAL,
+        recipient="+15550100",
+        subject="Alert",
+        content=f"message {i}"
+    )
+
+@pytest.fixture
+async def batcher():
+    batcher = NotificationBatcher(RecordingSender(), {
+        'batch_size': 10,
+        'max_batch_age': 0.05,
+        'worker_idle_timeout': 0.1
+    })
+    yield batcher
+    await batcher.close()
+
+async def test_batch_flushes_on_age(batcher):
+    await batcher.add(make_notification(1))
+    assert batcher.sender.sent == []
+    
+    await asyncio.sleep(0.1)
+    assert len(batcher.sender.sent) == 1
+    assert batcher.sender.sent[0].metadata['original_ids'] == ['n1']
+
+async def test_idle_worker_is_reaped(batcher):
+    await batcher.add(make_notification(1))
+    await asyncio.sleep(0.3)
+    assert batcher._workers == {}
+    assert batcher._queues == {}
+    
+    # A later notification starts a fresh worker
+    await batcher.add(make_notification(2))
+    await asyncio.sleep(0.1)
+    assert [
+        n.metadata['original_ids'] for n in batcher.sender.sent
+    ] == [['n1'], ['n2']]
@@ -0,0 +1,48 @@
+import pytest
+import asyncio
+import tracemalloc
+from agnes.optimization.profiler import PerformanceProfiler
+
+@pytest.fixture
+async def profiler():
+    profiler = PerformanceProfiler()
+    yield profiler
+    await profiler.stop()
+
+async def test_deep_call_stops_tracing_when_function_raises(profiler):
+    async def failing():
+        raise RuntimeError("boom")
+    
+    wrapped = await profiler.profile_function(failing, deep=True)
+    with pytest.raises(RuntimeError):
+        await wrapped()
+    
+    assert not tracemalloc.is_tracing()
+
+async def test_overlapping_deep_calls_keep_tracing(profiler):
+    release = asyncio.Event()
+    tracing = []
+    
+    async def slow():
+        await release.wait()
+        tracing.append(tracemalloc.is_tracing())
+    
+    async def fast():
+        tracing.append(tracemalloc.is_tracing())
+    
+    slow_task = asyncio.create_task(
+        (await profiler.profile_function(slow, deep=True))()
+    )
+    await asyncio.sleep(0)
+    fast_task = asyncio.create_task(
+        (await profiler.profile_function(fast, deep=True))()
+    )
+    await asyncio.sleep(0)
+    
+    release.set()
+    await asyncio.gather(slow_task, fast_task)
+    
+    assert tracing == [True, True]
+    assert not tracemalloc.is_tracing()
+    assert profiler.get_stats("slow")["call_count"] == 1
+    assert profiler.get_stats("fast")["call_count"] == 1
@@ -0,0 +1,115 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from agnes.monitor.system import (
+    SystemMonitor,
+    Metric,
+    MetricType,
+    MetricThreshold,
+    ThresholdWindow
+)
+
+@pytest.fixture
+def monitor():
+    # One hour of retention at half-hour cycles keeps two samples per series
+    return SystemMonitor({
+        'history_retention_hours': 1,
+        'collection_interval': 1800
+    })
+
+def process_metric(pid: str, value: float, timestamp: datetime) -> Metric:
+    return Metric(
+        name="process_cpu_usage",
+        type=MetricType.PROCESS,
+        value=value,
+        timestamp=timestamp,
+        labels={'host': 'test', 'pid': pid}
+    )
+
+async def test_history_is_bounded_per_series(monitor):
+    start = datetime.now(timezone.utc)
+    for cycle in range(5):
+        now = start + timedelta(minutes=30 * cycle)
+        for pid in ("1", "2"):
+            await monitor._process_metric(
+                process_metric(pid, float(cycle), now),
+                now
+            )
+    
+    assert len(monitor.history) == 2
+    for history in monitor.history.values():
+        assert [m.value for m in history] == [3.0, 4.0]
+
+async def test_sweep_drops_series_past_retention(monitor):
+    start = datetime.now(timezone.utc)
+    await monitor._process_metric(process_metric("1", 1.0, start), start)
+    
+    later = start + timedelta(hours=2)
+    await monitor._process_metric(process_metric("2", 1.0, later), later)
+    monitor._sweep_history(later)
+    
+    assert [
+        dict(labels)['pid'] for _, labels in monitor.history
+    ] == ["2"]
+
+async def test_windows_fill_before_handler_is_added(monitor):
+    monitor.add_threshold(
+        "system_cpu_usage",
+        warning=70,
+        error=85,
+        critical=95,
+        duration=600,
+        frequency=3
+    )
+    start = datetime.now(timezone.utc)
+    
+    def cpu_metric(value: float, timestamp: datetime) -> Metric:
+        return Metric(
+            name="system_cpu_usage",
+            type=MetricType.CPU,
+            value=value,
+            timestamp=timestamp,
+            labels={'host': 'test'}
+        )
+    
+    for i in range(2):
+        now = start + timedelta(seconds=10 * i)
+        await monitor._process_metric(cpu_metric(99.0, now), now)
+    
+    alerts = []
+    
+    async def handler(alert):
+        alerts.append(alert)
+    
+    monitor.add_alert_handler(handler)
+    
+    # The violation already in progress alerts on the next sample
+    now = start + timedelta(seconds=20)
+    await monitor._process_metric(cpu_metric(99.0, now), now)
+    assert [alert.level.value for alert in alerts] == ["critical"]
+
+def test_threshold_window_counts_and_expires():
+    window = ThresholdWindow(MetricThreshold(
+        warning=70,
+        error=85,
+        critical=95,
+        duration=60
+    ))
+    start = datetime.now(timezone.utc)
+    
+    window.add(start, 99.0)
+    window.add(start + timedelta(seconds=30), 90.0)
+    window.add(start + timedelta(seconds=45), 50.0)
+    assert (
+        window.critical_violations,
+        window.error_violations,
+        window.warning_violations
+    ) == (1, 2, 2)
+    
+    # The first sample falls out of the 60s window
+    window.expire(start + timedelta(seconds=70))
+    assert len(window.samples) == 2
+    assert (
+        window.critical_violations,
+        window.error_violations,
+        window.warning_violations
+    ) == (0, 1, 1)